@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Model_Api.settings')
 
 application = get_asgi_application()
+
+# Load the model once per worker at startup instead of once per request, and watch it for new versions
+from apis.registry import start_registries
+
+start_registries()
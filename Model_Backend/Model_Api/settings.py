@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apis.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -126,3 +127,84 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Model artifacts
+# The model is loaded once per process and reloaded when the file changes
+
+MODELS_DIR = BASE_DIR.parent / 'Models'
+
+MODEL_PATH = MODELS_DIR / 'GradientBoostingClassifier_model.pkl'
+
+# Scaler and one-hot layout exported from Model_training.ipynb
+PREPROCESSOR_PATH = MODELS_DIR / 'preprocessing.pkl'
+
+# Id vocabularies exported from Feature_Engineering.ipynb, optional
+VOCABULARY_PATH = MODELS_DIR / 'vocabulary.npz'
+
+# Seconds between checks of the artifact files for a new version (0 disables the watcher)
+MODEL_RELOAD_INTERVAL = 5
+
+# Number of records validated, encoded and scored together by the batch endpoint
+BATCH_CHUNK_SIZE = 1000
+
+# Micro-batching of concurrent requests on the async scoring endpoint (ASGI deployments)
+# A batch is scored once MICRO_BATCH_MAX_SIZE requests are pending or MICRO_BATCH_MAX_WAIT_MS has passed
+MICRO_BATCH_MAX_SIZE = 64
+
+MICRO_BATCH_MAX_WAIT_MS = 2
+
+MICRO_BATCH_WORKERS = 2
+
+# Online customer feature store (apis/feature_store.py)
+# Number of customers kept in the in-memory LRU cache and seconds before an entry is refreshed
+FEATURE_STORE_CACHE_SIZE = 100_000
+
+FEATURE_STORE_TTL = 300
+
+# Scored requests are logged to the Feature table by a background writer with bulk inserts
+PREDICTION_LOG_ENABLED = True
+
+PREDICTION_LOG_BATCH_SIZE = 500
+
+# Maximum seconds a logged prediction waits before being written
+PREDICTION_LOG_FLUSH_INTERVAL = 1.0
+
+# Predictions are dropped instead of slowing requests down once this many are waiting
+PREDICTION_LOG_MAX_QUEUE = 100_000
+
+# Serve GradientBoostingClassifier models with the array-based evaluator of apis/compiled_model.py
+COMPILE_MODEL = True
+
+# Larger batches are faster with sklearn's own evaluator
+COMPILED_MODEL_MAX_ROWS = 128
+
+# Risk label of a probability of being risky: the first label whose upper bound is >= the probability
+RISK_THRESHOLDS = [
+    (0.5, 'No Risk'),
+    (1.0, 'Has Risk'),
+]
+
+# Credit score points of the probabilities, same scaling as scorecardpy's scorecard():
+# POINTS0 points at odds ODDS0, and the score drops by PDO points every time the odds double
+SCORECARD_POINTS0 = 600
+SCORECARD_ODDS0 = 1 / 19
+SCORECARD_PDO = 50
+
+# Cache of predictions keyed on the encoded features and the model version (0 disables it)
+PREDICTION_CACHE_SIZE = 10_000
+
+# Seconds a cached prediction stays valid
+PREDICTION_CACHE_TTL = 3600
+
+# Addresses allowed to read the Prometheus metrics on /metrics
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Requests slower than this many seconds are logged with their stage breakdown...
+SLOW_REQUEST_THRESHOLD = 0.25
+
+# ...for this fraction of them
+SLOW_REQUEST_SAMPLE_RATE = 0.1
+
+# Page size of the cursor paginated GET /features/
+FEATURE_PAGE_SIZE = 100
@@ -17,7 +17,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from apis.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view),
     path('', include('apis.urls'))
 ]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Model_Api.settings')
 
 application = get_wsgi_application()
+
+# Load the model once per worker at startup instead of once per request, and watch it for new versions
+from apis.registry import start_registries
+
+start_registries()
@@ -0,0 +1,125 @@
+import asyncio
+import contextvars
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from django.conf import settings
+
+from .metrics import stage
+from .registry import model_registry, preprocessor_registry
+from .scoring import score_cached, scorecard_points
+
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    '''
+    Coalesces concurrent scoring requests into batches.
+
+    Requests are queued until max_batch_size are pending or max_wait_ms has passed since the
+    first one arrived, then the whole batch is scored with one call in a thread pool and each
+    caller gets its own result back. All the bookkeeping happens on the event loop thread,
+    so it needs no locks.
+
+    Parameters:
+    -----------
+        batch_fn(callable): scores a list of items and returns a list of results in the same order
+        executor(Executor): where batch_fn runs, so the event loop is never blocked
+        max_batch_size(int): flush as soon as this many items are pending
+        max_wait_ms(float): flush at the latest this long after the first pending item
+    '''
+
+    def __init__(self, batch_fn: Callable, executor, max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._pending = []
+        self._timer = None
+
+
+    async def submit(self, item):
+        '''
+        Queues an item for the next batch and waits for its result
+        '''
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush, loop)
+        return await future
+
+
+    def _flush(self, loop):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+        # run_in_executor does not carry the context over, copying it keeps the stage breakdown of the request
+        done = loop.run_in_executor(self.executor, contextvars.copy_context().run, self.batch_fn, items)
+        done.add_done_callback(lambda result: self._resolve(result, futures))
+
+
+    def _resolve(self, result, futures):
+        error = result.exception()
+        if error is not None:
+            logger.error(f"Error scoring micro-batch of {len(futures)}: {error}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for future, value in zip(futures, result.result()):
+            # Callers that disconnected have had their future cancelled
+            if not future.done():
+                future.set_result(value)
+
+
+def score_batch(records: list) -> list:
+    '''
+    Encodes and scores validated feature records with the artifacts currently loaded
+
+    Returns:
+        one (label, probability, points, model_version) tuple per record
+    '''
+    artifact = model_registry.current
+    encoder = preprocessor_registry.current
+    with stage('encode'):
+        X = encoder.obj.encode(records)
+    with stage('predict'):
+        labels, probabilities = score_cached(artifact, X)
+    points = scorecard_points(probabilities)
+    return [(label, float(p), int(pt), artifact.version) for label, p, pt in zip(labels, probabilities, points)]
+
+
+_executor = ThreadPoolExecutor(max_workers=settings.MICRO_BATCH_WORKERS, thread_name_prefix='micro-batch')
+
+# One batcher per event loop, since futures cannot be shared between loops
+_batchers = weakref.WeakKeyDictionary()
+
+
+def get_batcher() -> MicroBatcher:
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = MicroBatcher(
+            score_batch,
+            _executor,
+            max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+            max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS,
+        )
+        _batchers[loop] = batcher
+    return batcher
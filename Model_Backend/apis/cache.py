@@ -0,0 +1,109 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+
+class PredictionCache:
+    '''
+    Bounded LRU cache of predictions with a TTL, in front of the model.
+
+    The key is a hash of the encoded float32 feature vector, which is the canonical form of
+    a request (fixed column order and dtype, scaling applied), together with the model
+    version. A new model version therefore never hits entries of the previous one, and
+    the cache is cleared as soon as a new version is seen.
+
+    Parameters:
+    -----------
+        max_size(int): maximum number of cached predictions
+        ttl(float): seconds a prediction stays valid
+    '''
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._cache = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+
+    def _key(self, version: bytes, row: np.ndarray) -> bytes:
+        return hashlib.blake2b(version + row.tobytes(), digest_size=16).digest()
+
+
+    def score(self, artifact, X: np.ndarray, score_fn):
+        '''
+        Scores X, only passing the rows that are not cached to score_fn
+
+        Parameters:
+        -----------
+            artifact(LoadedArtifact): the model and its version
+            X(np.ndarray): encoded feature rows
+            score_fn(callable): score_fn(model, X) -> (labels, probabilities)
+
+        Returns:
+            (labels, probabilities)
+        '''
+        version = artifact.version.encode()
+        keys = [self._key(version, row) for row in X]
+        labels = [None] * len(keys)
+        probabilities = np.empty(len(keys))
+        missing = []
+
+        now = time.monotonic()
+        with self._lock:
+            if artifact.version != self._version:
+                # The model artifact changed, nothing cached is valid anymore
+                self._cache.clear()
+                self._version = artifact.version
+
+            for i, key in enumerate(keys):
+                entry = self._cache.get(key)
+                if entry is not None and entry[0] > now:
+                    self._cache.move_to_end(key)
+                    labels[i], probabilities[i] = entry[1], entry[2]
+                else:
+                    missing.append(i)
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if not missing:
+            return labels, probabilities
+
+        missing_labels, missing_probabilities = score_fn(artifact.obj, X[missing])
+        with self._lock:
+            for i, label, probability in zip(missing, missing_labels, missing_probabilities):
+                labels[i], probabilities[i] = label, probability
+                if artifact.version == self._version:
+                    self._cache[keys[i]] = (now + self.ttl, label, float(probability))
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return labels, probabilities
+
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+    def info(self) -> dict:
+        return {
+            'size': len(self._cache),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'model_version': self._version,
+        }
+
+
+# Disabled when PREDICTION_CACHE_SIZE is 0
+prediction_cache = PredictionCache(settings.PREDICTION_CACHE_SIZE, settings.PREDICTION_CACHE_TTL) if settings.PREDICTION_CACHE_SIZE else None
@@ -0,0 +1,138 @@
+import logging
+
+import numpy as np
+from scipy.special import expit
+
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledGradientBoosting:
+    '''
+    A fitted binary GradientBoostingClassifier flattened into contiguous NumPy arrays.
+
+    All the trees are stored as one node table (feature, threshold, children, leaf value)
+    and every row walks every tree at once, one level per step, so scoring a row costs a
+    handful of vectorized operations instead of sklearn's input validation and one
+    dispatch per estimator.
+
+    The probabilities are bit-identical to predict_proba: the rows are compared as float32
+    to the float64 thresholds, the init prediction is the same constant, the leaf values are
+    scaled by the learning rate and accumulated in estimator order in float64, and the
+    result goes through the same expit.
+
+    Walking all the trees at once materializes (rows x trees) arrays, so above max_rows
+    sklearn's own evaluator is faster and the rows are handed to it instead.
+
+    Parameters:
+    -----------
+        model(GradientBoostingClassifier): the fitted binary classifier, with log_loss and the default init
+        max_rows(int): largest number of rows evaluated with the compiled arrays
+    '''
+
+    def __init__(self, model, max_rows: int = 128):
+        if getattr(model, 'loss', None) != 'log_loss' or model.n_trees_per_iteration_ != 1:
+            raise ValueError("Only binary GradientBoostingClassifier models with log_loss can be compiled")
+        if not (isinstance(model.init_, str) and model.init_ == 'zero') and type(model.init_).__name__ != 'DummyClassifier':
+            raise ValueError(f"Cannot compile a model with init estimator {model.init_!r}")
+
+        self.estimator = model
+        self.max_rows = max_rows
+        self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+        self.n_estimators = len(model.estimators_)
+        self.learning_rate = model.learning_rate
+
+        # The init estimator predicts the same raw value for every row
+        self.init_raw_ = float(model._raw_predict_init(np.zeros((1, self.n_features_in_), dtype=np.float32))[0, 0])
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset, depth = 0, 0
+        for (estimator,) in model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(tree.node_count)
+
+            roots.append(offset)
+            # Leaves point to themselves, so walking further than a tree's depth is a no-op
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            values.append(tree.value[:, 0, 0])
+            offset += tree.node_count
+            depth = max(depth, tree.max_depth)
+
+        self.feature_ = np.ascontiguousarray(np.concatenate(features), dtype=np.intp)
+        self.threshold_ = np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64)
+        self.children_left_ = np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp)
+        self.children_right_ = np.ascontiguousarray(np.concatenate(rights), dtype=np.intp)
+        # Scaled once here, sklearn computes the same learning_rate * value product per row
+        self.scaled_value_ = np.ascontiguousarray(self.learning_rate * np.concatenate(values), dtype=np.float64)
+        self.roots_ = np.asarray(roots, dtype=np.intp)
+        self.max_depth_ = depth
+
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        '''
+        The raw (log-odds) prediction of every row
+
+        Parameters:
+        -----------
+            X(np.ndarray): encoded feature rows, converted to float32 like sklearn does
+
+        Returns:
+            np.ndarray of shape (n_rows,)
+        '''
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has shape {X.shape}, the model expects {self.n_features_in_} features")
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity")
+
+        # One column per tree, every row walks every tree one level at a time
+        nodes = np.tile(self.roots_, (X.shape[0], 1))
+        for _ in range(self.max_depth_):
+            x = np.take_along_axis(X, self.feature_[nodes], axis=1)
+            nodes = np.where(x <= self.threshold_[nodes], self.children_left_[nodes], self.children_right_[nodes])
+
+        # cumsum adds sequentially, in the same order as sklearn's stage by stage loop
+        raw = np.empty((X.shape[0], self.n_estimators + 1))
+        raw[:, 0] = self.init_raw_
+        raw[:, 1:] = self.scaled_value_[nodes]
+        return np.cumsum(raw, axis=1)[:, -1]
+
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if len(X) > self.max_rows:
+            return self.estimator.predict_proba(X)
+        raw = self.decision_function(X)
+        proba = np.empty((raw.shape[0], 2))
+        proba[:, 1] = expit(raw)
+        proba[:, 0] = 1 - proba[:, 1]
+        return proba
+
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def compile_model(model, max_rows: int = 128):
+    '''
+    Compiles a GradientBoostingClassifier for serving, keeping any other model as it is
+
+    Parameters:
+    -----------
+        model: the deserialized model
+        max_rows(int): largest number of rows evaluated with the compiled arrays
+
+    Returns:
+        CompiledGradientBoosting or the model itself if it cannot be compiled
+    '''
+    if type(model).__name__ != 'GradientBoostingClassifier':
+        return model
+    try:
+        return CompiledGradientBoosting(model, max_rows=max_rows)
+    except Exception as e:
+        logger.warning(f"Serving the model with sklearn, it could not be compiled: {e}")
+        return model
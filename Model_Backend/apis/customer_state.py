@@ -0,0 +1,92 @@
+import pandas as pd
+from django.db import transaction
+
+from .models import CustomerState
+
+
+def summarize_transactions(transactions: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Collapses a batch of transactions to one row of partial aggregates per customer
+
+    Parameters:
+    -----------
+        transactions(pd.DataFrame): raw transactions with CustomerId, TransactionId, Amount and TransactionStartTime
+
+    Returns:
+        pd.DataFrame indexed by CustomerId
+    '''
+    start_time = pd.to_datetime(transactions['TransactionStartTime'], utc=True)
+    grouped = transactions.assign(TransactionStartTime=start_time).groupby(by='CustomerId')
+    partial = grouped.agg(
+        Transaction_Count=('TransactionId', 'size'),
+        Amount_Count=('Amount', 'count'),
+        Total_transaction_amount=('Amount', 'sum'),
+        Amount_Mean=('Amount', 'mean'),
+        First_Transaction=('TransactionStartTime', 'min'),
+        Last_Transaction=('TransactionStartTime', 'max'),
+    )
+    partial['Amount_M2'] = grouped['Amount'].var(ddof=0).fillna(0) * partial['Amount_Count']
+    partial['Amount_Mean'] = partial['Amount_Mean'].fillna(0)
+    return partial
+
+
+def _merge(state: CustomerState, partial) -> CustomerState:
+    # Chan's parallel update of the count, mean and M2
+    n_a, n_b = state.Amount_Count, int(partial.Amount_Count)
+    n = n_a + n_b
+    if n_b:
+        delta = partial.Amount_Mean - state.Amount_Mean
+        state.Amount_Mean = partial.Amount_Mean if n_a == 0 else state.Amount_Mean + delta * n_b / n
+        state.Amount_M2 = state.Amount_M2 + partial.Amount_M2 + delta ** 2 * n_a * n_b / n
+    state.Amount_Count = n
+    state.Transaction_Count += int(partial.Transaction_Count)
+    state.Total_transaction_amount += float(partial.Total_transaction_amount)
+
+    first, last = partial.First_Transaction.to_pydatetime(), partial.Last_Transaction.to_pydatetime()
+    state.First_Transaction = first if state.First_Transaction is None else min(state.First_Transaction, first)
+    state.Last_Transaction = last if state.Last_Transaction is None else max(state.Last_Transaction, last)
+    return state
+
+
+STATE_FIELDS = ['Transaction_Count', 'Amount_Count', 'Total_transaction_amount', 'Amount_Mean', 'Amount_M2',
+                'First_Transaction', 'Last_Transaction', 'Updated_At']
+
+
+def absorb_transactions(transactions: pd.DataFrame, batch_size: int = 1000) -> int:
+    '''
+    Merges new transactions into the per-customer state.
+
+    Only the customers present in the new transactions are read and written, so the cost
+    is proportional to the delta and not to the history. Everything is written in one
+    database transaction with bulk inserts and updates, a savepoint when called inside the
+    transaction of a whole file (see manage.py absorb_transactions).
+
+    Returns:
+        the number of customers updated or created
+    '''
+    partials = summarize_transactions(transactions)
+    customer_ids = [str(customer_id) for customer_id in partials.index]
+
+    with transaction.atomic():
+        existing = {}
+        # Stay below SQLite's limit on the number of query parameters
+        for i in range(0, len(customer_ids), batch_size):
+            existing.update(CustomerState.objects.in_bulk(customer_ids[i:i + batch_size], field_name='CustomerId'))
+
+        created, updated = [], []
+        for customer_id, partial in zip(customer_ids, partials.itertuples()):
+            state = existing.get(customer_id)
+            if state is None:
+                created.append(_merge(CustomerState(CustomerId=customer_id), partial))
+            else:
+                updated.append(_merge(state, partial))
+
+        # bulk_update does not go through save(), so auto_now has to be set by hand
+        now = pd.Timestamp.now(tz='UTC').to_pydatetime()
+        for state in created + updated:
+            state.Updated_At = now
+
+        CustomerState.objects.bulk_create(created, batch_size=batch_size)
+        CustomerState.objects.bulk_update(updated, STATE_FIELDS, batch_size=batch_size)
+
+    return len(created) + len(updated)
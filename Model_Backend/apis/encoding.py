@@ -0,0 +1,126 @@
+import numpy as np
+
+from .models import Feature
+
+
+# Column order of X in Model_training.ipynb, used when no preprocessing artifact provides it
+TRAINING_COLUMNS = [
+    'ProviderId', 'ProductId', 'ChannelId', 'Amount', 'Transaction_Hour', 'Transaction_Day',
+    'Average_transaction_amount', 'STD_Transaction_Amount', 'Transaction_Month',
+] + [f'ProductCategory_{value}' for value in sorted(value for value, _ in Feature.Product_Choices)]
+
+
+class FeatureEncoder:
+    '''
+    Encodes validated FeatureSerializer data straight into a float32 matrix in training
+    column order, applying the scaler exported from Model_training.ipynb
+    (see PreprocessingArtifact in scripts/Preprocessor.py).
+
+    Everything that does not depend on the request (column slots, the one-hot index of every
+    Feature.Product_Choices value, the mean/scale vectors) is computed once when the encoder
+    is built, so encoding is a handful of column assignments into a preallocated buffer.
+
+    float32 is what the tree models use internally, so encoding into it loses nothing.
+
+    Parameters:
+    -----------
+        artifact(dict): the exported preprocessing artifact
+    '''
+    category_feature = 'ProductCategory'
+
+    def __init__(self, artifact: dict):
+        self.columns = list(artifact.get('columns') or TRAINING_COLUMNS)
+        self.continuous_features = list(artifact['continuous_features'])
+
+        # (field, column index) of the continuous features with their scaling, and of the raw numeric features
+        self._continuous = [(col, self.columns.index(col)) for col in self.continuous_features]
+        self._mean = np.asarray(artifact['mean'], dtype=np.float64)
+        self._scale = np.asarray(artifact['scale'], dtype=np.float64)
+        self._numeric = [
+            (col, idx) for idx, col in enumerate(self.columns)
+            if col not in self.continuous_features and not col.startswith(f'{self.category_feature}_')
+        ]
+
+        # Column of the one-hot dummy of each product category, categories unseen in training have none
+        self._category_index = {
+            value: self.columns.index(f'{self.category_feature}_{value}')
+            for value, _ in Feature.Product_Choices
+            if f'{self.category_feature}_{value}' in self.columns
+        }
+
+
+    @property
+    def n_features(self) -> int:
+        return len(self.columns)
+
+
+    def allocate(self, n_rows: int) -> np.ndarray:
+        '''
+        Allocates a buffer that can be passed to encode() and reused between calls
+        '''
+        return np.empty((n_rows, self.n_features), dtype=np.float32)
+
+
+    def encode(self, records: list, out: np.ndarray = None) -> np.ndarray:
+        '''
+        Encodes and scales a list of validated feature dicts
+
+        Parameters:
+        -----------
+            records(list): validated FeatureSerializer data
+            out(np.ndarray): optional float32 buffer with at least len(records) rows
+
+        Returns:
+            np.ndarray of shape (len(records), n_features)
+        '''
+        n_rows = len(records)
+        X = self.allocate(n_rows) if out is None else out[:n_rows]
+        X.fill(0)
+
+        for col, idx in self._numeric:
+            X[:, idx] = [record[col] for record in records]
+
+        # Scale in float64 like StandardScaler did in training, then store as float32
+        continuous = np.array([[record[col] for col, _ in self._continuous] for record in records], dtype=np.float64)
+        continuous -= self._mean
+        continuous /= self._scale
+        X[:, [idx for _, idx in self._continuous]] = continuous
+
+        category_idx = np.fromiter(
+            (self._category_index.get(record[self.category_feature], -1) for record in records),
+            dtype=np.intp, count=n_rows,
+        )
+        seen = category_idx >= 0
+        X[np.flatnonzero(seen), category_idx[seen]] = 1
+        return X
+
+
+    def encode_frame(self, frame, out: np.ndarray = None) -> np.ndarray:
+        '''
+        Column-wise counterpart of encode() for a DataFrame of validated feature columns
+        (see validate_frame in apis/scoring.py), producing the same matrix
+
+        Parameters:
+        -----------
+            frame(pd.DataFrame): the feature columns of FeatureSerializer
+            out(np.ndarray): optional float32 buffer with at least len(frame) rows
+
+        Returns:
+            np.ndarray of shape (len(frame), n_features)
+        '''
+        n_rows = len(frame)
+        X = self.allocate(n_rows) if out is None else out[:n_rows]
+        X.fill(0)
+
+        for col, idx in self._numeric:
+            X[:, idx] = frame[col].to_numpy(dtype=np.float64)
+
+        continuous = frame[[col for col, _ in self._continuous]].to_numpy(dtype=np.float64)
+        continuous -= self._mean
+        continuous /= self._scale
+        X[:, [idx for _, idx in self._continuous]] = continuous
+
+        category_idx = frame[self.category_feature].map(self._category_index).fillna(-1).to_numpy(dtype=np.intp)
+        seen = category_idx >= 0
+        X[np.flatnonzero(seen), category_idx[seen]] = 1
+        return X
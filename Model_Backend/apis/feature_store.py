@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import CustomerState
+
+
+class CustomerFeatureStore:
+    '''
+    Online lookup of the per-customer aggregate features used by the model.
+
+    The aggregates are read from CustomerState (kept up to date by manage.py absorb_transactions)
+    and kept in a bounded LRU cache, so repeated lookups of active customers never reach the
+    database. Entries expire after ttl seconds so absorbed deltas show up without a restart.
+
+    Parameters:
+    -----------
+        max_size(int): maximum number of customers kept in the cache
+        ttl(float): seconds before a cached entry is read again from the database
+    '''
+
+    def __init__(self, max_size: int = 100_000, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, customer_id: str):
+        '''
+        The aggregate features of a customer
+
+        Returns:
+            dict with Average_transaction_amount and STD_Transaction_Amount, None for unknown customers
+        '''
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(customer_id)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(customer_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        features = self._load(customer_id)
+
+        with self._lock:
+            self._cache[customer_id] = (now + self.ttl, features)
+            self._cache.move_to_end(customer_id)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return features
+
+
+    def _load(self, customer_id: str):
+        state = CustomerState.objects.filter(CustomerId=customer_id).first()
+        if state is None:
+            return None
+        return {
+            'Average_transaction_amount': state.Average_transaction_amount or 0.0,
+            # Single transaction customers have no std, training filled it with 0
+            'STD_Transaction_Amount': state.STD_Transaction_Amount or 0.0,
+        }
+
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+    def info(self) -> dict:
+        return {'size': len(self._cache), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses}
+
+
+feature_store = CustomerFeatureStore(max_size=settings.FEATURE_STORE_CACHE_SIZE, ttl=settings.FEATURE_STORE_TTL)
@@ -0,0 +1,56 @@
+import hashlib
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apis.customer_state import absorb_transactions
+from apis.models import AbsorbedFile, CustomerState
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Merges a file of new transactions (CSV or Parquet) into the per-customer state'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or Parquet file of new transactions')
+        parser.add_argument('--chunksize', type=int, default=100_000, help='number of rows absorbed at a time')
+        parser.add_argument('--reset', action='store_true', help='drop the current state first, to rebuild it from a full history')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        columns = ['TransactionId', 'CustomerId', 'Amount', 'TransactionStartTime']
+        try:
+            sha256 = file_sha256(path)
+            if path.endswith('.parquet'):
+                import pyarrow.parquet as pq
+                batches = pq.ParquetFile(path).iter_batches(batch_size=options['chunksize'], columns=columns)
+                chunks = (batch.to_pandas() for batch in batches)
+            else:
+                chunks = pd.read_csv(path, usecols=columns, chunksize=options['chunksize'])
+
+            # The reset, every chunk and the record of the file are committed together, so a failure
+            # part way leaves the state as it was and the file can simply be absorbed again
+            with transaction.atomic():
+                if options['reset']:
+                    CustomerState.objects.all().delete()
+                    AbsorbedFile.objects.all().delete()
+                elif AbsorbedFile.objects.filter(Sha256=sha256).exists():
+                    raise CommandError(f'{path} has already been absorbed, its transactions would be counted twice')
+
+                customers = rows = 0
+                for chunk in chunks:
+                    customers += absorb_transactions(chunk)
+                    rows += len(chunk)
+                AbsorbedFile.objects.create(Sha256=sha256, Path=path, Transaction_Count=rows)
+        except (OSError, ValueError, TypeError) as e:
+            raise CommandError(f'Error absorbing {path}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Absorbed {rows} transactions ({customers} customer updates)'))
@@ -0,0 +1,168 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import joblib
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apis.encoding import FeatureEncoder
+from apis.scoring import score, scorecard_points, validate_frame
+from apis.vocabulary import Vocabulary
+
+
+# Model, encoder and id vocabulary of a scoring process, loaded once by _init_worker
+_model = None
+_encoder = None
+_vocabulary = None
+
+
+def _init_worker(model_path: str, preprocessor_path: str, vocabulary_path: str):
+    global _model, _encoder, _vocabulary
+    import django
+    django.setup()
+    _model = joblib.load(model_path)
+    _encoder = FeatureEncoder(joblib.load(preprocessor_path))
+    _vocabulary = Vocabulary(vocabulary_path) if os.path.exists(vocabulary_path) else None
+
+
+def _score_chunk(chunk: pd.DataFrame, id_columns: list) -> pd.DataFrame:
+    '''
+    Validates, encodes and scores one chunk, the rows that fail validation get their errors instead of a score
+    '''
+    # Raw ids (ProviderId_6, ...) are turned into the training codes first
+    features = _vocabulary.encode_frame(chunk) if _vocabulary is not None else chunk
+    errors = validate_frame(features)
+    valid = errors.isna().to_numpy()
+
+    result = pd.DataFrame({col: chunk[col].astype(str) for col in id_columns}, index=chunk.index)
+    result.insert(0, 'row', chunk.index.to_numpy(dtype=np.int64))
+    result['prediction'] = None
+    result['probability'] = np.nan
+    result['points'] = pd.array([pd.NA] * len(chunk), dtype='Int64')
+
+    if valid.any():
+        labels, probabilities = score(_model, _encoder.encode_frame(features[valid]))
+        result.loc[valid, 'prediction'] = labels
+        result.loc[valid, 'probability'] = probabilities
+        result.loc[valid, 'points'] = scorecard_points(probabilities).astype(np.int64)
+    result['errors'] = errors
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Scores every row of a CSV or Parquet file of features chunk by chunk in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='CSV or Parquet file with the FeatureSerializer columns')
+        parser.add_argument('output', help='CSV or Parquet file the scores are written to')
+        parser.add_argument('--chunksize', type=int, default=50_000, help='number of rows scored at a time')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of scoring processes')
+        parser.add_argument('--id-columns', nargs='*', default=['TransactionId', 'CustomerId'],
+                            help='input columns copied to the output when present')
+
+    def _chunks(self, path: str, chunksize: int):
+        if path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            start = 0
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+                chunk = batch.to_pandas()
+                chunk.index = pd.RangeIndex(start, start + len(chunk))
+                start += len(chunk)
+                yield chunk
+        else:
+            # The chunks of read_csv keep numbering the rows from where the previous one stopped
+            yield from pd.read_csv(path, chunksize=chunksize)
+
+    def _writer(self, path: str):
+        '''
+        Returns a function appending a result chunk to the output file, and one closing it
+        '''
+        if path.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            state = {}
+
+            def write(result):
+                schema = pa.schema([
+                    (col, pa.int64() if col in ('row', 'points') else pa.float64() if col == 'probability' else pa.string())
+                    for col in result.columns
+                ])
+                table = pa.Table.from_pandas(result, schema=schema, preserve_index=False)
+                if 'writer' not in state:
+                    state['writer'] = pq.ParquetWriter(path, schema)
+                state['writer'].write_table(table)
+
+            def close():
+                if 'writer' in state:
+                    state['writer'].close()
+            return write, close
+
+        state = {'header': True}
+
+        def write(result):
+            result.to_csv(path, mode='w' if state['header'] else 'a', header=state['header'], index=False)
+            state['header'] = False
+        return write, lambda: None
+
+    def handle(self, *args, **options):
+        chunksize, workers = options['chunksize'], max(1, options['workers'])
+        paths = (str(settings.MODEL_PATH), str(settings.PREPROCESSOR_PATH), str(settings.VOCABULARY_PATH))
+        write, close = self._writer(options['output'])
+
+        rows = 0
+        start = time.perf_counter()
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=paths) if workers > 1 else None
+        try:
+            if executor is None:
+                _init_worker(*paths)
+
+            # At most two chunks per worker are in flight, so memory stays bounded whatever the input size
+            pending = deque()
+            for number, chunk in enumerate(self._chunks(options['input'], chunksize)):
+                id_columns = [col for col in options['id_columns'] if col in chunk]
+                if executor is None:
+                    pending.append((number, chunk.index, _score_chunk(chunk, id_columns)))
+                else:
+                    try:
+                        pending.append((number, chunk.index, executor.submit(_score_chunk, chunk, id_columns)))
+                    except BrokenProcessPool as e:
+                        # The pool broke on a chunk still in flight, the oldest one is the first lost
+                        raise self._broken(*(pending[0][:2] if pending else (number, chunk.index)), e)
+
+                while pending and (executor is None or len(pending) >= 2 * workers):
+                    rows += self._write(*pending.popleft(), write, rows, start)
+            while pending:
+                rows += self._write(*pending.popleft(), write, rows, start)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Error scoring {options['input']}: {e}")
+        finally:
+            close()
+            if executor is not None:
+                executor.shutdown()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Scored {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)'))
+
+    def _write(self, number: int, index: pd.Index, result, write, rows: int, start: float) -> int:
+        if not isinstance(result, pd.DataFrame):
+            try:
+                result = result.result()
+            except BrokenProcessPool as e:
+                raise self._broken(number, index, e)
+        write(result)
+        rows += len(result)
+        self.stdout.write(f'{rows} rows, {rows / (time.perf_counter() - start):.0f} rows/s')
+        return len(result)
+
+    @staticmethod
+    def _broken(number: int, index: pd.Index, error: Exception) -> CommandError:
+        # A worker died (killed, out of memory, crashed in native code), the rows written so far are kept
+        return CommandError(
+            f'A scoring process terminated abruptly while scoring chunk {number} '
+            f'(rows {index[0]} to {index[-1]}): {error}'
+        )
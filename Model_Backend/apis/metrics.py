@@ -0,0 +1,244 @@
+import bisect
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+logger = logging.getLogger(__name__)
+
+
+# Upper bounds in seconds, from well under a millisecond for the stages to seconds for batch requests
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    '''
+    Cumulative-bucket latency histogram in the Prometheus model, observing a value is one
+    bisect and three additions
+    '''
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    '''
+    In-process counters and latency histograms of the API, rendered in the Prometheus
+    text exposition format by the /metrics endpoint.
+
+    Every metric is keyed on its name and a tuple of (label, value) pairs. The labels are
+    kept to a few low-cardinality values (route, method, status, stage).
+    '''
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+
+    def observe(self, name: str, labels: tuple, seconds: float):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+
+    @staticmethod
+    def _labels(labels: tuple, extra: tuple = ()) -> str:
+        pairs = labels + extra
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+    def render(self) -> str:
+        '''
+        All the metrics in the Prometheus text exposition format
+        '''
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (list(h.counts), h.sum, h.count, h.buckets)) for key, h in self._histograms.items()
+            )
+
+        lines = []
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{self._labels(labels)} {value}')
+
+        for (name, labels), (counts, total, count, buckets) in histograms:
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{self._labels(labels, (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{self._labels(labels)} {total}')
+            lines.append(f'{name}_count{self._labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+metrics.describe('http_requests_total', 'Requests handled, by route, method and status code')
+metrics.describe('http_request_duration_seconds', 'Request latency, by route and method')
+metrics.describe('scoring_stage_duration_seconds', 'Time spent in each stage of the scoring path')
+
+# Stage durations of the request being handled, set by MetricsMiddleware
+_stages: ContextVar = ContextVar('scoring_stages', default=None)
+
+
+@contextmanager
+def stage(name: str):
+    '''
+    Times one stage of the scoring path (validate, encode, predict, ...) into the stage
+    histogram and the breakdown of the current request
+    '''
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe('scoring_stage_duration_seconds', (('stage', name),), elapsed)
+        stages = _stages.get()
+        if stages is not None:
+            stages[name] = stages.get(name, 0.0) + elapsed
+
+
+class MetricsMiddleware:
+    '''
+    Counts the requests and times them per route, and logs a sample of the slow ones with
+    their stage breakdown. Works for both the sync and the async views.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stages, start = {}, time.perf_counter()
+        token = _stages.set(stages)
+        try:
+            response = self.get_response(request)
+        finally:
+            _stages.reset(token)
+        return self._finish(request, response, start, stages)
+
+
+    async def __acall__(self, request):
+        stages, start = {}, time.perf_counter()
+        token = _stages.set(stages)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stages.reset(token)
+        return self._finish(request, response, start, stages)
+
+
+    def _finish(self, request, response, start: float, stages: dict):
+        if not response.streaming:
+            self._record(request, response, time.perf_counter() - start, stages)
+            return response
+
+        # A streaming response does its work (e.g. the batch scoring) while it is consumed,
+        # so it is timed until its last chunk and its stages are recorded in the same breakdown
+        if response.is_async:
+            response.streaming_content = self._astream(response.streaming_content, request, response, start, stages)
+        else:
+            response.streaming_content = self._stream(response.streaming_content, request, response, start, stages)
+        return response
+
+
+    def _stream(self, content, request, response, start: float, stages: dict):
+        iterator = iter(content)
+        try:
+            while True:
+                # Set and reset around every chunk, the chunks may be pulled from different contexts
+                token = _stages.set(stages)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    _stages.reset(token)
+                yield chunk
+        finally:
+            self._record(request, response, time.perf_counter() - start, stages)
+
+
+    async def _astream(self, content, request, response, start: float, stages: dict):
+        iterator = aiter(content)
+        try:
+            while True:
+                token = _stages.set(stages)
+                try:
+                    chunk = await anext(iterator)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    _stages.reset(token)
+                yield chunk
+        finally:
+            self._record(request, response, time.perf_counter() - start, stages)
+
+
+    def _record(self, request, response, elapsed: float, stages: dict):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        metrics.inc('http_requests_total', (('route', route), ('method', request.method), ('status', response.status_code)))
+        metrics.observe('http_request_duration_seconds', (('route', route), ('method', request.method)), elapsed)
+
+        if elapsed >= settings.SLOW_REQUEST_THRESHOLD and random.random() < settings.SLOW_REQUEST_SAMPLE_RATE:
+            breakdown = ', '.join(f'{name}={seconds * 1000:.2f}ms' for name, seconds in stages.items())
+            logger.warning(f"Slow request {request.method} /{route} {response.status_code} took {elapsed * 1000:.1f}ms ({breakdown or 'no stages'})")
+
+
+def metrics_view(request):
+    '''
+    The metrics in the Prometheus text format, only served to the addresses in METRICS_ALLOWED_IPS
+    '''
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
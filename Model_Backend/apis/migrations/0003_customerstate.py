@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0002_rename_features_feature'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('CustomerId', models.CharField(max_length=100, unique=True)),
+                ('Transaction_Count', models.BigIntegerField(default=0)),
+                ('Amount_Count', models.BigIntegerField(default=0)),
+                ('Total_transaction_amount', models.FloatField(default=0)),
+                ('Amount_Mean', models.FloatField(default=0)),
+                ('Amount_M2', models.FloatField(default=0)),
+                ('First_Transaction', models.DateTimeField(null=True)),
+                ('Last_Transaction', models.DateTimeField(null=True)),
+                ('Updated_At', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0003_customerstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feature',
+            name='Created_At',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='feature',
+            name='Model_Version',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='feature',
+            name='Prediction',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='feature',
+            name='Probability',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(fields=['ProductCategory'], name='apis_featur_Product_b5483e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(fields=['ProviderId'], name='apis_featur_Provide_045431_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(fields=['ChannelId'], name='apis_featur_Channel_c9bc38_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(fields=['Prediction'], name='apis_featur_Predict_bea18a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(fields=['Created_At'], name='apis_featur_Created_9eb99c_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0004_feature_prediction_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbsorbedFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Sha256', models.CharField(max_length=64, unique=True)),
+                ('Path', models.CharField(max_length=500)),
+                ('Transaction_Count', models.BigIntegerField()),
+                ('Absorbed_At', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -1,4 +1,7 @@
+import math
+
 from django.db import models
+from django.utils import timezone
 
 
 class Feature(models.Model):
@@ -25,7 +28,71 @@ class Feature(models.Model):
     STD_Transaction_Amount = models.FloatField()
     Transaction_Month = models.IntegerField()
 
+    # Filled in when the features are logged by the scoring endpoints
+    Prediction = models.CharField(max_length=20, null=True, blank=True)
+    Probability = models.FloatField(null=True, blank=True)
+    Model_Version = models.CharField(max_length=20, null=True, blank=True)
+    Created_At = models.DateTimeField(default=timezone.now)
+
+
+    class Meta:
+        # The filters of FeatureView.get, SQLite indexes also carry the id used by the cursor pagination
+        indexes = [
+            models.Index(fields=['ProductCategory']),
+            models.Index(fields=['ProviderId']),
+            models.Index(fields=['ChannelId']),
+            models.Index(fields=['Prediction']),
+            models.Index(fields=['Created_At']),
+        ]
 
 
     def __str__(self):
         return f"The Product category {self.ProductCategory}. The total amount {self.Amount}"
+
+
+class CustomerState(models.Model):
+    '''
+    Running per-customer aggregates of the transaction history.
+
+    The amounts are kept as a count, sum, mean and M2 (sum of squared deviations from the
+    mean) so a day of new transactions can be merged in without the full history, see
+    apis/customer_state.py.
+    '''
+    CustomerId = models.CharField(max_length=100, unique=True)
+    Transaction_Count = models.BigIntegerField(default=0)
+    Amount_Count = models.BigIntegerField(default=0)
+    Total_transaction_amount = models.FloatField(default=0)
+    Amount_Mean = models.FloatField(default=0)
+    Amount_M2 = models.FloatField(default=0)
+    First_Transaction = models.DateTimeField(null=True)
+    Last_Transaction = models.DateTimeField(null=True)
+    Updated_At = models.DateTimeField(auto_now=True)
+
+
+    @property
+    def Average_transaction_amount(self):
+        return self.Total_transaction_amount / self.Amount_Count if self.Amount_Count else None
+
+
+    @property
+    def STD_Transaction_Amount(self):
+        return math.sqrt(self.Amount_M2 / (self.Amount_Count - 1)) if self.Amount_Count > 1 else None
+
+
+    def __str__(self):
+        return f"{self.CustomerId}: {self.Transaction_Count} transactions, total amount {self.Total_transaction_amount}"
+
+
+class AbsorbedFile(models.Model):
+    '''
+    A transaction file merged into CustomerState, recorded in the same database transaction
+    as the merge so the same file cannot be counted twice
+    '''
+    Sha256 = models.CharField(max_length=64, unique=True)
+    Path = models.CharField(max_length=500)
+    Transaction_Count = models.BigIntegerField()
+    Absorbed_At = models.DateTimeField(auto_now_add=True)
+
+
+    def __str__(self):
+        return f"{self.Path} ({self.Transaction_Count} transactions, absorbed {self.Absorbed_At})"
@@ -0,0 +1,58 @@
+import codecs
+import csv
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+def _decoded(lines):
+    # Undecodable bytes surface while the body is read lazily, as a ParseError like the other input errors
+    try:
+        yield from lines
+    except UnicodeDecodeError as e:
+        raise ParseError(f'Could not decode the body: {e}')
+
+
+class NDJSONParser(BaseParser):
+    '''
+    Parses newline delimited JSON, one feature record per line.
+
+    Records are yielded lazily so large uploads are never held in memory at once.
+    '''
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        return self._records(codecs.getreader(encoding)(stream) if stream is not None else [])
+
+    def _records(self, lines):
+        for line_number, line in enumerate(_decoded(lines), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ParseError(f'NDJSON parse error on line {line_number}: {e}')
+
+
+class CSVParser(BaseParser):
+    '''
+    Parses a CSV upload with a header row, one feature record per row.
+
+    Records are yielded lazily so large uploads are never held in memory at once.
+    '''
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if stream is None:
+            return iter(())
+        return self._records(csv.DictReader(_decoded(codecs.getreader(encoding)(stream))))
+
+    def _records(self, reader):
+        try:
+            yield from reader
+        except csv.Error as e:
+            raise ParseError(f'CSV parse error on line {reader.line_num}: {e}')
@@ -0,0 +1,141 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.db import close_old_connections
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Feature
+
+
+logger = logging.getLogger(__name__)
+
+
+# The request fields stored with every prediction
+FEATURE_FIELDS = [
+    'ProviderId', 'ProductId', 'ProductCategory', 'ChannelId', 'Amount', 'Transaction_Hour', 'Transaction_Day',
+    'Average_transaction_amount', 'STD_Transaction_Amount', 'Transaction_Month',
+]
+
+
+class PredictionLogWriter:
+    '''
+    Logs scored features and their predictions off the request path.
+
+    Requests only put the record on an in-memory queue, a background thread drains it and
+    writes the records with one bulk_create per batch_size records or per flush_interval
+    seconds, whichever comes first. When the queue is full records are dropped (and counted)
+    rather than slowing requests down.
+
+    Parameters:
+    -----------
+        batch_size(int): maximum number of rows per bulk insert
+        flush_interval(float): maximum seconds a record waits before being written
+        max_queue(int): maximum number of records waiting to be written
+    '''
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 1.0, max_queue: int = 100_000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._writer = None
+        self._lock = threading.Lock()
+
+
+    def log(self, feature_data: dict, prediction: str, probability: float, model_version: str):
+        '''
+        Queues one scored record, never blocks
+        '''
+        record = Feature(
+            **{field: feature_data[field] for field in FEATURE_FIELDS},
+            Prediction=prediction,
+            Probability=probability,
+            Model_Version=model_version,
+            Created_At=timezone.now(),
+        )
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        self._ensure_writer()
+
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._run, name='prediction-log', daemon=True)
+                    self._writer.start()
+
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        # The first record of the batch waits at most flush_interval, however the others trickle in
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                batch.append(self._queue.get(timeout=remaining))
+        except queue.Empty:
+            pass
+        return batch
+
+
+    def _write(self, batch: list):
+        try:
+            Feature.objects.bulk_create(batch, batch_size=self.batch_size)
+            self.written += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            logger.error(f"Error writing {len(batch)} logged predictions: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            close_old_connections()
+            self._write(batch)
+
+
+    def flush(self):
+        '''
+        Writes everything still queued, used at shutdown
+        '''
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.join()
+            return
+
+        # No writer thread, e.g. at interpreter exit: write from the calling thread
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+
+
+    def info(self) -> dict:
+        return {'queued': self._queue.qsize(), 'written': self.written, 'dropped': self.dropped}
+
+
+prediction_log = PredictionLogWriter(
+    batch_size=settings.PREDICTION_LOG_BATCH_SIZE,
+    flush_interval=settings.PREDICTION_LOG_FLUSH_INTERVAL,
+    max_queue=settings.PREDICTION_LOG_MAX_QUEUE,
+)
+
+atexit.register(prediction_log.flush)
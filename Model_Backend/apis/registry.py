@@ -0,0 +1,185 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, NamedTuple, Optional
+
+import joblib
+from django.conf import settings
+
+from .compiled_model import compile_model
+from .encoding import FeatureEncoder
+from .metrics import stage
+from .vocabulary import Vocabulary
+
+
+logger = logging.getLogger(__name__)
+
+
+class LoadedArtifact(NamedTuple):
+    '''
+    An artifact that has been deserialized and is kept resident in memory
+    '''
+    obj: Any
+    version: str
+    loaded_at: datetime
+    path: str
+
+
+class ArtifactRegistry:
+    '''
+    Keeps one deserialized copy of an artifact (e.g. the trained model) per process.
+
+    The artifact is loaded once, served from memory on every request and swapped
+    atomically by a background watcher when the file on disk changes, so requests
+    never pay for disk I/O or deserialization.
+
+    Parameters:
+    -----------
+        path(str): path to the serialized artifact
+        loader(callable): function turning a file object into the artifact, defaults to joblib.load
+        poll_interval(float): seconds between checks of the file for a new version, also the
+            minimum time (at least a second) between two load attempts of a missing or broken artifact
+    '''
+
+    def __init__(self, path, loader: Callable = joblib.load, poll_interval: float = 5.0):
+        self.path = str(path)
+        self.loader = loader
+        self.poll_interval = poll_interval
+
+        self._current: Optional[LoadedArtifact] = None
+        self._file_state = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+
+    @property
+    def current(self) -> Optional[LoadedArtifact]:
+        '''
+        The artifact currently in memory, loading it on first access if needed.
+        A missing or broken artifact is not retried more than once per poll_interval,
+        so requests do not each pay for a failed load and its error log.
+        '''
+        if self._current is None and time.monotonic() >= self._retry_at:
+            self.load()
+        return self._current
+
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+
+    def load(self, force: bool = False) -> Optional[LoadedArtifact]:
+        '''
+        Deserializes the artifact and swaps it in if the file changed since the last load
+
+        Returns:
+            LoadedArtifact or None if the file could not be loaded
+        '''
+        with self._lock:
+            file_state = None
+            try:
+                file_state = self._stat()
+                if not force and self._current is not None and file_state == self._file_state:
+                    return self._current
+
+                with stage('load_artifact'):
+                    with open(self.path, 'rb') as file:
+                        content = file.read()
+                    obj = self.loader(io.BytesIO(content))
+
+                artifact = LoadedArtifact(
+                    obj=obj,
+                    version=hashlib.sha256(content).hexdigest()[:12],
+                    loaded_at=datetime.now(timezone.utc),
+                    path=self.path,
+                )
+            except Exception as e:
+                logger.error(f"Error loading artifact {self.path}: {e}")
+                self._retry_at = time.monotonic() + max(self.poll_interval, 1.0)
+                # The watcher tries a broken file again only once it changes
+                if file_state is not None:
+                    self._file_state = file_state
+                return self._current
+
+            # A single reference assignment, so readers see either the old or the new artifact
+            self._current = artifact
+            self._file_state = file_state
+            logger.info(f"Loaded {self.path} (version {artifact.version})")
+            return artifact
+
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                changed = self._stat() != self._file_state
+            except OSError:
+                continue
+            if changed:
+                self.load()
+
+
+    def start(self):
+        '''
+        Loads the artifact and starts the background thread that picks up new versions
+        '''
+        self.load()
+        if self.poll_interval and (self._watcher is None or not self._watcher.is_alive()):
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name=f"watch:{os.path.basename(self.path)}", daemon=True)
+            self._watcher.start()
+
+
+    def stop(self):
+        self._stop.set()
+
+
+    def info(self) -> dict:
+        '''
+        Version information about the artifact currently in memory
+        '''
+        artifact = self._current
+        if artifact is None:
+            return {'path': self.path, 'version': None, 'loaded_at': None}
+        return {
+            'path': artifact.path,
+            'version': artifact.version,
+            'loaded_at': artifact.loaded_at.isoformat(),
+        }
+
+
+model_registry = ArtifactRegistry(
+    settings.MODEL_PATH,
+    loader=(lambda file: compile_model(joblib.load(file), max_rows=settings.COMPILED_MODEL_MAX_ROWS)) if settings.COMPILE_MODEL else joblib.load,
+    poll_interval=settings.MODEL_RELOAD_INTERVAL,
+)
+
+preprocessor_registry = ArtifactRegistry(
+    settings.PREPROCESSOR_PATH,
+    loader=lambda file: FeatureEncoder(joblib.load(file)),
+    poll_interval=settings.MODEL_RELOAD_INTERVAL,
+)
+
+vocabulary_registry = ArtifactRegistry(
+    settings.VOCABULARY_PATH,
+    loader=Vocabulary,
+    poll_interval=settings.MODEL_RELOAD_INTERVAL,
+)
+
+
+def start_registries():
+    '''
+    Loads the artifacts and starts their watchers, called by the WSGI/ASGI entry points so that
+    management commands (migrate, absorb_transactions, score_portfolio, ...) start no threads
+    '''
+    model_registry.start()
+    preprocessor_registry.start()
+    # The vocabulary is only needed to score raw ids, so its absence is not an error
+    if os.path.exists(vocabulary_registry.path):
+        vocabulary_registry.start()
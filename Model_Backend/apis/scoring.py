@@ -0,0 +1,166 @@
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError, ValidationError
+
+from .cache import prediction_cache
+from .metrics import stage
+from .serializers import FLOAT32_MAX, FeatureSerializer
+
+
+def risk_labels(probabilities: np.ndarray, thresholds: list = None) -> list:
+    '''
+    Maps probabilities of being risky to labels with a threshold table, so the cutoffs can
+    be changed without retraining
+
+    Parameters:
+    -----------
+        probabilities(np.ndarray): probability of the positive class of every row
+        thresholds(list): (upper bound, label) pairs sorted by bound, defaults to settings.RISK_THRESHOLDS
+
+    Returns:
+        list of labels
+    '''
+    thresholds = thresholds or settings.RISK_THRESHOLDS
+    bounds = np.array([bound for bound, _ in thresholds])
+    labels = [label for _, label in thresholds]
+    index = np.minimum(np.searchsorted(bounds, probabilities, side='left'), len(labels) - 1)
+    return [labels[i] for i in index]
+
+
+def scorecard_points(probabilities: np.ndarray) -> np.ndarray:
+    '''
+    Credit score points of probabilities of being risky, with the scaling of scorecardpy:
+    points = a - b * log(odds), b = pdo / log(2), a = points0 + b * log(odds0)
+
+    Returns:
+        np.ndarray of rounded points
+    '''
+    b = settings.SCORECARD_PDO / np.log(2)
+    a = settings.SCORECARD_POINTS0 + b * np.log(settings.SCORECARD_ODDS0)
+    eps = np.finfo(np.float64).eps
+    p = np.clip(np.asarray(probabilities, dtype=np.float64), eps, 1 - eps)
+    return np.round(a - b * np.log(p / (1 - p)))
+
+
+def score(model, X: np.ndarray):
+    '''
+    Scores a feature matrix with a single predict_proba call
+
+    Returns:
+        (labels, probabilities): the risk label of each row and its probability of being risky
+    '''
+    probabilities = model.predict_proba(X)[:, 1]
+    return risk_labels(probabilities), probabilities
+
+
+def score_cached(artifact, X: np.ndarray):
+    '''
+    Scores a feature matrix with the loaded model artifact, through the prediction
+    cache when it is enabled
+
+    Returns:
+        (labels, probabilities)
+    '''
+    if prediction_cache is None:
+        return score(artifact.obj, X)
+    return prediction_cache.score(artifact, X, score)
+
+
+def validate_records(records):
+    '''
+    Validates feature records with a single serializer instance, so the fields are
+    built once for the whole batch instead of once per record
+
+    Yields:
+        (validated_data, None) for valid records and (None, errors) for invalid ones
+    '''
+    serializer = FeatureSerializer()
+    for record in records:
+        try:
+            yield serializer.run_validation(record), None
+        except ValidationError as e:
+            yield None, e.detail
+
+
+def validate_frame(frame: pd.DataFrame) -> pd.Series:
+    '''
+    Vectorized counterpart of validate_records for a DataFrame with one column per
+    FeatureSerializer field, checking the same types and choices column by column
+
+    Returns:
+        pd.Series of error messages aligned with frame, None for valid rows
+    '''
+    errors = pd.Series('', index=frame.index, dtype=object)
+    for name, field in FeatureSerializer().fields.items():
+        if field.read_only:
+            continue
+        if name not in frame:
+            raise ValueError(f"Missing column {name}")
+
+        if isinstance(field, serializers.ChoiceField):
+            invalid, message = ~frame[name].isin(list(field.choices)), 'not a valid choice.'
+        else:
+            values = pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=np.float64)
+            invalid = ~(np.abs(values) <= FLOAT32_MAX)
+            message = 'a finite number within the float32 range is required.'
+            if isinstance(field, serializers.IntegerField):
+                invalid |= np.isfinite(values) & (values % 1 != 0)
+                message = 'a valid integer is required.'
+
+        errors[np.asarray(invalid)] += f'{name}: {message} '
+    return errors.str.strip().replace('', None)
+
+
+def score_records(records, artifact, encoder, chunk_size: int = 1000, prediction_log=None):
+    '''
+    Validates, encodes and scores an iterable of feature records chunk by chunk
+
+    Parameters:
+    -----------
+        records(iterable): dicts shaped like FeatureSerializer
+        artifact(LoadedArtifact): the loaded model
+        encoder(FeatureEncoder): the encoder built from the preprocessing exported with the model
+        chunk_size(int): number of records scored per model call
+        prediction_log(PredictionLogWriter): where to log the scored records, if given
+
+    Yields:
+        one result dict per record, in input order. A ParseError of the records is raised
+        after the results of every record before it
+    '''
+    validated = enumerate(validate_records(records))
+    buffer = encoder.allocate(chunk_size)
+    error = None
+    while error is None:
+        chunk = []
+        try:
+            chunk.extend(islice(validated, chunk_size))
+        except ParseError as e:
+            # A lazily parsed body can fail mid-chunk, the records read before the error are still scored
+            error = e
+        if not chunk:
+            break
+
+        valid = [(row, data) for row, (data, errors) in chunk if errors is None]
+        if valid:
+            with stage('encode'):
+                X = encoder.encode([data for _, data in valid], out=buffer)
+            with stage('predict'):
+                labels, probabilities = score_cached(artifact, X)
+            points = scorecard_points(probabilities)
+            scored = {row: (label, float(p), int(pt)) for (row, _), label, p, pt in zip(valid, labels, probabilities, points)}
+            if prediction_log is not None:
+                for (_, data), label, p in zip(valid, labels, probabilities):
+                    prediction_log.log(data, label, float(p), artifact.version)
+
+        for row, (data, errors) in chunk:
+            if errors is not None:
+                yield {'row': row, 'errors': errors}
+            else:
+                label, probability, points = scored[row]
+                yield {'row': row, 'prediction': label, 'probability': probability, 'points': points}
+    if error is not None:
+        raise error
@@ -1,10 +1,85 @@
+import numpy as np
 from rest_framework import serializers
 
 from .models import Feature
+from .registry import vocabulary_registry
+from .vocabulary import parse_number
+
+
+# The features are scored as float32, larger numbers would become inf in the encoded matrix
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+class Float32RangeMixin:
+    '''
+    Rejects numbers that are not finite or do not fit in float32, field by field
+    (NaN compares as False, so it is rejected too)
+    '''
+
+    def validate(self, data):
+        errors = {
+            name: 'Ensure this value is a finite number within the float32 range.'
+            for name, value in data.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+            and not abs(value) <= FLOAT32_MAX
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+        return super().validate(data)
+
+
+class EncodedIdField(serializers.IntegerField):
+    '''
+    An id feature as the integer code the model was trained on. Raw ids (e.g. 'ProviderId_6')
+    are encoded with the vocabulary exported from Feature_Engineering.ipynb, ids that were
+    not seen in training get its unseen code.
+    '''
+    default_error_messages = {
+        'no_vocabulary': 'Raw ids need the vocabulary artifact, send the integer code instead.',
+    }
+
+    def to_internal_value(self, data):
+        # Text that parses as a number is a code ('5', '5.0', '1e3'), anything else is a raw id
+        if isinstance(data, str):
+            number = parse_number(data)
+            if number is None:
+                vocabulary = vocabulary_registry.current
+                if vocabulary is None or self.field_name not in vocabulary.obj:
+                    self.fail('no_vocabulary')
+                data = vocabulary.obj.code(self.field_name, data)
+            elif number.is_integer():
+                data = int(number)
+        return super().to_internal_value(data)
+
+
+class FeatureSerializer(Float32RangeMixin, serializers.ModelSerializer):
+    ProviderId = EncodedIdField()
+    ProductId = EncodedIdField()
+    ChannelId = EncodedIdField()
 
-class FeatureSerializer(serializers.ModelSerializer):
     class Meta:
         fields = '__all__'
+        read_only_fields = ['Prediction', 'Probability', 'Model_Version', 'Created_At']
 
         model = Feature
-   
\ No newline at end of file
+
+
+class TransactionSerializer(Float32RangeMixin, serializers.Serializer):
+    '''
+    A raw transaction to score, the customer aggregates are looked up server side
+    '''
+    CustomerId = serializers.CharField(max_length=100)
+    ProviderId = EncodedIdField()
+    ProductId = EncodedIdField()
+    ProductCategory = serializers.ChoiceField(choices=Feature.Product_Choices)
+    ChannelId = EncodedIdField()
+    Amount = serializers.FloatField()
+    TransactionStartTime = serializers.DateTimeField()
+
+    def validate(self, data):
+        data = super().validate(data)
+        start_time = data['TransactionStartTime']
+        data['Transaction_Hour'] = start_time.hour
+        data['Transaction_Day'] = start_time.day
+        data['Transaction_Month'] = start_time.month
+        return data
@@ -1,3 +1,703 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from unittest import mock
 
-# Create your tests here.
+import joblib
+import numpy as np
+import pandas as pd
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from .batching import MicroBatcher
+from .cache import PredictionCache, prediction_cache
+from .compiled_model import CompiledGradientBoosting, compile_model
+from .customer_state import absorb_transactions
+from .encoding import TRAINING_COLUMNS, FeatureEncoder
+from .feature_store import feature_store
+from .models import AbsorbedFile, CustomerState, Feature
+from .prediction_log import PredictionLogWriter
+from .registry import ArtifactRegistry, LoadedArtifact, model_registry, preprocessor_registry, vocabulary_registry
+from .scoring import risk_labels, validate_frame
+from .views import FeaturePagination
+from .vocabulary import Vocabulary
+
+
+def make_features(n_rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 6)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(scale=0.5, size=n_rows) > 0).astype(int)
+    return X, y
+
+
+def feature_record(**overrides) -> dict:
+    record = {
+        'ProviderId': 5, 'ProductId': 10, 'ProductCategory': 'airtime', 'ChannelId': 2, 'Amount': 1000.0,
+        'Transaction_Hour': 10, 'Transaction_Day': 5, 'Average_transaction_amount': 900.0,
+        'STD_Transaction_Amount': 300.0, 'Transaction_Month': 11,
+    }
+    record.update(overrides)
+    return record
+
+
+# Preprocessing artifact of served_artifacts(), in the layout exported from Model_training.ipynb
+ENCODER_ARTIFACT = {
+    'continuous_features': ['Amount', 'Average_transaction_amount', 'STD_Transaction_Amount'],
+    'mean': [1000.0, 900.0, 300.0], 'scale': [2000.0, 1500.0, 500.0],
+}
+
+
+def served_artifacts():
+    '''
+    A small model and encoder in the layout of the exported artifacts, and the records they were fitted on
+    '''
+    encoder = FeatureEncoder(ENCODER_ARTIFACT)
+    rng = np.random.default_rng(0)
+    records = [
+        feature_record(Amount=float(amount), ProviderId=int(provider), ProductCategory=category)
+        for amount, provider, category in zip(
+            rng.normal(1000, 2000, 200).round(2), rng.integers(0, 6, 200),
+            rng.choice(['airtime', 'financial_services', 'utility_bill'], 200),
+        )
+    ]
+    y = np.array([record['Amount'] > 1000 for record in records], dtype=int)
+    model = LogisticRegression().fit(encoder.encode(records), y)
+    return model, encoder, records
+
+
+class ServedModelMixin:
+    '''
+    Serves the model of served_artifacts() from the registries, without logging the predictions
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model, cls.encoder, cls.records = served_artifacts()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        loaded_at = datetime.now(timezone.utc)
+        for patcher in (
+            mock.patch.object(model_registry, '_current', LoadedArtifact(self.model, 'test-model', loaded_at, 'model.pkl')),
+            mock.patch.object(preprocessor_registry, '_current', LoadedArtifact(self.encoder, 'test-encoder', loaded_at, 'preprocessing.pkl')),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        no_log = override_settings(PREDICTION_LOG_ENABLED=False)
+        no_log.enable()
+        self.addCleanup(no_log.disable)
+        # Predictions cached by other tests would hide the model and settings of this one
+        if prediction_cache is not None:
+            prediction_cache.clear()
+
+    def expected_probabilities(self, records) -> np.ndarray:
+        return self.model.predict_proba(self.encoder.encode(records))[:, 1]
+
+
+class ArtifactRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'model.pkl')
+
+    def test_loads_once_and_swaps_new_versions(self):
+        joblib.dump({'version': 1}, self.path)
+        registry = ArtifactRegistry(self.path, poll_interval=0)
+        first = registry.current
+        self.assertEqual(first.obj, {'version': 1})
+        self.assertIs(registry.current, first)
+
+        joblib.dump({'version': 2, 'padding': 'x'}, self.path)
+        second = registry.load()
+        self.assertEqual(second.obj, {'version': 2, 'padding': 'x'})
+        self.assertNotEqual(second.version, first.version)
+        self.assertIs(registry.current, second)
+
+    def test_failed_loads_are_retried_once_per_interval(self):
+        loader = mock.Mock(side_effect=ValueError('broken'))
+        with open(self.path, 'wb') as file:
+            file.write(b'broken')
+        registry = ArtifactRegistry(self.path, loader=loader, poll_interval=60)
+        with self.assertLogs('apis.registry', 'ERROR'):
+            self.assertIsNone(registry.current)
+        self.assertIsNone(registry.current)
+        self.assertEqual(loader.call_count, 1)
+
+
+class UnavailableModelTests(TestCase):
+
+    def test_scoring_endpoints_return_503(self):
+        client = APIClient()
+        transaction = {
+            'CustomerId': 'CustomerId_1', 'ProviderId': 5, 'ProductId': 10, 'ProductCategory': 'airtime',
+            'ChannelId': 2, 'Amount': 1000.0, 'TransactionStartTime': '2024-01-01T10:00:00Z',
+        }
+        with mock.patch.object(model_registry, '_current', None), mock.patch.object(model_registry, '_retry_at', math.inf), \
+                mock.patch.object(preprocessor_registry, '_current', None), mock.patch.object(preprocessor_registry, '_retry_at', math.inf):
+            self.assertEqual(client.post('/features/', feature_record(), format='json').status_code, 503)
+            self.assertEqual(client.post('/features/batch/', [feature_record()], format='json').status_code, 503)
+            self.assertEqual(client.post('/score/', transaction, format='json').status_code, 503)
+
+
+class CompiledModelTests(SimpleTestCase):
+    '''
+    The compiled evaluator has to return exactly what sklearn returns
+    '''
+
+    def assert_same_as_sklearn(self, model, X):
+        compiled = CompiledGradientBoosting(model, max_rows=128)
+        np.testing.assert_array_equal(compiled.predict_proba(X), model.predict_proba(X))
+        np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+
+    def test_bit_identical_to_predict_proba(self):
+        X, y = make_features(600)
+        for max_depth in (1, 3, 5):
+            model = GradientBoostingClassifier(n_estimators=30, max_depth=max_depth, random_state=0).fit(X, y)
+            for rows in (1, 7, 128):
+                self.assert_same_as_sklearn(model, X[:rows])
+
+    def test_zero_init(self):
+        X, y = make_features(300, seed=1)
+        model = GradientBoostingClassifier(n_estimators=20, init='zero', random_state=0).fit(X, y)
+        self.assert_same_as_sklearn(model, X[:64])
+
+    def test_large_batches_are_delegated(self):
+        X, y = make_features(600, seed=2)
+        model = GradientBoostingClassifier(n_estimators=10, random_state=0).fit(X, y)
+        self.assert_same_as_sklearn(model, X)
+
+    def test_other_models_are_not_compiled(self):
+        X, y = make_features(100)
+        model = LogisticRegression().fit(X, y)
+        self.assertIs(compile_model(model), model)
+
+
+class BatchFeatureViewTests(ServedModelMixin, TestCase):
+
+    def read_lines(self, response) -> list:
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_json_batch(self):
+        records = self.records[:50] + [feature_record(ProductCategory='unknown')]
+        results = self.read_lines(self.client.post('/features/batch/', records, format='json'))
+
+        self.assertEqual([result['row'] for result in results], list(range(51)))
+        self.assertIn('ProductCategory', results[-1]['errors'])
+        np.testing.assert_allclose(
+            [result['probability'] for result in results[:-1]], self.expected_probabilities(records[:-1]), rtol=1e-6,
+        )
+
+    def test_csv_batch(self):
+        columns = list(self.records[0])
+        body = '\n'.join([','.join(columns)] + [','.join(str(record[col]) for col in columns) for record in self.records[:20]])
+        results = self.read_lines(self.client.post('/features/batch/', body, content_type='text/csv'))
+        np.testing.assert_allclose([result['probability'] for result in results], self.expected_probabilities(self.records[:20]), rtol=1e-6)
+
+    def test_rows_before_a_parse_error_are_scored(self):
+        body = '\n'.join([json.dumps(record) for record in self.records[:3]] + ['{not json'])
+        results = self.read_lines(self.client.post('/features/batch/', body, content_type='application/x-ndjson'))
+
+        self.assertEqual([result.get('row') for result in results[:3]], [0, 1, 2])
+        self.assertIn('line 4', results[-1]['error'])
+
+    def test_rejects_non_list_bodies(self):
+        for body in ('5', 'null', 'true', '"abc"', '{}'):
+            response = self.client.post('/features/batch/', body, content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+
+
+class EncodedIdTests(ServedModelMixin, TestCase):
+    '''
+    Ids are integer codes, possibly written as text, or raw ids encoded with the vocabulary,
+    by EncodedIdField for single records and by Vocabulary.encode_frame for files
+    '''
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # Laid out like VocabularyEncoder.save: the sorted distinct values of every column
+        path = os.path.join(directory.name, 'vocabulary.npz')
+        np.savez_compressed(
+            path, __columns__=np.array(['ProviderId', 'ProductId', 'ChannelId']),
+            ProviderId=np.array(['ProviderId_1', 'ProviderId_3', 'ProviderId_5', 'ProviderId_6']),
+            ProductId=np.array(['ProductId_10', 'ProductId_3']),
+            ChannelId=np.array(['ChannelId_2', 'ChannelId_3']),
+        )
+        self.vocabulary = Vocabulary(path)
+
+    def use_vocabulary(self):
+        patcher = mock.patch.object(
+            vocabulary_registry, '_current', LoadedArtifact(self.vocabulary, 'test-vocabulary', datetime.now(timezone.utc), 'vocabulary.npz'),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post_probability(self, record) -> float:
+        response = self.client.post('/features/', record, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['probability']
+
+    def test_numeric_text_is_a_code(self):
+        record = self.records[0]
+        [expected] = self.expected_probabilities([record])
+        for provider_id in (str(record['ProviderId']), f"{record['ProviderId']}.0", f" {record['ProviderId']} "):
+            self.assertAlmostEqual(self.post_probability({**record, 'ProviderId': provider_id}), expected, places=6)
+        [expected] = self.expected_probabilities([{**record, 'ProductId': 1000}])
+        self.assertAlmostEqual(self.post_probability({**record, 'ProductId': '1e3'}), expected, places=6)
+
+    def test_fractional_codes_are_rejected(self):
+        for provider_id in ('5.5', 'nan', 'inf', 5.5):
+            response = self.client.post('/features/', feature_record(ProviderId=provider_id), format='json')
+            self.assertEqual(response.status_code, 400, provider_id)
+            self.assertIn('ProviderId', response.json())
+
+    def test_raw_ids_need_the_vocabulary(self):
+        # No vocabulary is loaded, and none is looked for
+        with mock.patch.object(vocabulary_registry, '_current', None), mock.patch.object(vocabulary_registry, '_retry_at', math.inf):
+            response = self.client.post('/features/', feature_record(ProviderId='ProviderId_5'), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('vocabulary', response.json()['ProviderId'][0])
+
+    def test_raw_ids_are_encoded(self):
+        self.use_vocabulary()
+        record = feature_record(ProviderId='ProviderId_5', ProductId='ProductId_unseen', ChannelId='ChannelId_3')
+        [expected] = self.expected_probabilities([feature_record(ProviderId=2, ProductId=2, ChannelId=1)])
+        self.assertAlmostEqual(self.post_probability(record), expected, places=6)
+
+    def test_csv_batch_with_raw_ids_and_numeric_text(self):
+        self.use_vocabulary()
+        records = [
+            feature_record(ProviderId='ProviderId_6'), feature_record(ProviderId='3.0'),
+            feature_record(ProviderId='1e0'), feature_record(ProviderId='ProviderId_9'),
+        ]
+        columns = list(records[0])
+        body = '\n'.join([','.join(columns)] + [','.join(str(record[col]) for col in columns) for record in records])
+        response = self.client.post('/features/batch/', body, content_type='text/csv')
+        results = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        expected = self.expected_probabilities([feature_record(ProviderId=code) for code in (3, 3, 1, 4)])
+        np.testing.assert_allclose([result['probability'] for result in results], expected, rtol=1e-6)
+
+    def test_encode_frame_follows_the_field(self):
+        self.use_vocabulary()
+        frame = pd.DataFrame([feature_record() for _ in range(6)])
+        frame['ProviderId'] = pd.Series(['ProviderId_5', 3, '4.0', None, 'ProviderId_9', '2.5'], dtype=object)
+        frame['ProductId'] = pd.Series(['ProductId_3', 'ProductId_10', '1e1', 'x', 'ProductId_3', '10'], dtype='category')
+
+        encoded = self.vocabulary.encode_frame(frame)
+        np.testing.assert_array_equal(encoded['ProviderId'], [2, 3, 4, np.nan, 4, 2.5])
+        np.testing.assert_array_equal(encoded['ProductId'], [1, 0, 10, 2, 1, 10])
+        # Integer codes are left as they are
+        pd.testing.assert_series_equal(encoded['ChannelId'], frame['ChannelId'])
+
+        # The missing and the fractional ids are rejected like the API rejects them
+        errors = validate_frame(encoded)
+        self.assertEqual(list(errors.notna()), [False, False, False, True, False, True])
+        for record, error in zip(frame[['ProviderId']].to_dict('records'), errors):
+            response = self.client.post('/features/', {**feature_record(), **record}, format='json')
+            self.assertEqual(response.status_code, 400 if error else 200, record)
+
+
+class FeatureEncoderTests(SimpleTestCase):
+    '''
+    The encoder has to give the matrix of the DataFrame, get_dummies and StandardScaler
+    pipeline of Model_training.ipynb
+    '''
+    continuous_features = ['Amount', 'Transaction_Hour', 'Transaction_Day', 'Average_transaction_amount', 'STD_Transaction_Amount', 'Transaction_Month']
+
+    def setUp(self):
+        _, _, self.records = served_artifacts()
+        frame = pd.DataFrame(self.records)
+        self.scaler = StandardScaler().fit(frame[self.continuous_features])
+        self.encoder = FeatureEncoder({
+            'columns': TRAINING_COLUMNS, 'continuous_features': self.continuous_features,
+            'mean': self.scaler.mean_, 'scale': self.scaler.scale_,
+        })
+
+    def legacy_matrix(self, records) -> np.ndarray:
+        frame = pd.DataFrame(records)
+        for column in TRAINING_COLUMNS:
+            if column.startswith('ProductCategory_'):
+                frame[column] = frame['ProductCategory'] == column[len('ProductCategory_'):]
+        frame = frame[TRAINING_COLUMNS]
+        frame[self.continuous_features] = self.scaler.transform(frame[self.continuous_features])
+        return frame.to_numpy(dtype=np.float32)
+
+    def test_encode_matches_the_training_pipeline(self):
+        np.testing.assert_array_equal(self.encoder.encode(self.records), self.legacy_matrix(self.records))
+
+    def test_encode_frame_matches_encode(self):
+        np.testing.assert_array_equal(self.encoder.encode_frame(pd.DataFrame(self.records)), self.encoder.encode(self.records))
+
+    def test_out_of_range_numbers_are_rejected(self):
+        response = APIClient().post('/features/', feature_record(Amount=1e300), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Amount', response.json())
+
+        errors = validate_frame(pd.DataFrame([feature_record(), feature_record(Amount=1e300), feature_record(Amount=float('nan'))]))
+        self.assertIsNone(errors[0])
+        self.assertIn('Amount', errors[1])
+        self.assertIn('Amount', errors[2])
+
+
+class MicroBatcherTests(SimpleTestCase):
+
+    def test_concurrent_requests_are_batched_in_order(self):
+        batches = []
+
+        def batch_fn(items):
+            batches.append(list(items))
+            return [item * 2 for item in items]
+
+        async def run():
+            batcher = MicroBatcher(batch_fn, executor, max_batch_size=4, max_wait_ms=50)
+            return await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            results = asyncio.run(run())
+
+        self.assertEqual(results, [0, 2, 4, 6, 8, 10])
+        self.assertEqual(batches, [[0, 1, 2, 3], [4, 5]])
+
+    def test_errors_reach_every_caller(self):
+        def batch_fn(items):
+            raise ValueError('broken model')
+
+        async def run():
+            batcher = MicroBatcher(batch_fn, executor, max_batch_size=2, max_wait_ms=1)
+            return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with self.assertLogs('apis.batching', 'ERROR'):
+                results = asyncio.run(run())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+
+class AsyncFeatureViewTests(ServedModelMixin, SimpleTestCase):
+
+    async def test_scores_without_reading_the_registries_on_the_event_loop(self):
+        loop_thread = threading.get_ident()
+        reading_threads = []
+        current = ArtifactRegistry.current
+
+        def traced_current(registry):
+            reading_threads.append(threading.get_ident())
+            return current.fget(registry)
+
+        with mock.patch.object(ArtifactRegistry, 'current', property(traced_current)):
+            responses = await asyncio.gather(*(
+                self.async_client.post('/features/async/', record, content_type='application/json')
+                for record in self.records[:5]
+            ))
+
+        self.assertEqual([response.status_code for response in responses], [200] * 5)
+        np.testing.assert_allclose(
+            [response.json()['probability'] for response in responses], self.expected_probabilities(self.records[:5]), rtol=1e-6,
+        )
+        self.assertTrue(reading_threads)
+        self.assertNotIn(loop_thread, reading_threads)
+
+
+class CustomerStateTests(TestCase):
+    '''
+    Absorbing transactions chunk by chunk has to give the aggregates of the whole history
+    '''
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n_rows = 500
+        self.transactions = pd.DataFrame({
+            'TransactionId': [f'TransactionId_{i}' for i in range(n_rows)],
+            'CustomerId': [f'CustomerId_{i}' for i in rng.integers(0, 40, n_rows)],
+            'Amount': rng.normal(2000, 5000, n_rows).round(2),
+            'TransactionStartTime': pd.date_range('2018-11-15', periods=n_rows, freq='37min', tz='UTC'),
+        })
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def assert_state_matches(self, transactions):
+        expected = transactions.groupby('CustomerId').agg(
+            count=('TransactionId', 'size'),
+            total=('Amount', 'sum'),
+            mean=('Amount', 'mean'),
+            std=('Amount', 'std'),
+            first=('TransactionStartTime', 'min'),
+            last=('TransactionStartTime', 'max'),
+        )
+        states = {state.CustomerId: state for state in CustomerState.objects.all()}
+        self.assertEqual(set(states), set(expected.index))
+        for customer_id, row in expected.iterrows():
+            state = states[customer_id]
+            self.assertEqual(state.Transaction_Count, row['count'])
+            self.assertAlmostEqual(state.Total_transaction_amount, row['total'], places=6)
+            self.assertAlmostEqual(state.Average_transaction_amount, row['mean'], places=6)
+            if math.isnan(row['std']):
+                self.assertIsNone(state.STD_Transaction_Amount)
+            else:
+                self.assertAlmostEqual(state.STD_Transaction_Amount, row['std'], places=6)
+            self.assertEqual(state.First_Transaction, row['first'].to_pydatetime())
+            self.assertEqual(state.Last_Transaction, row['last'].to_pydatetime())
+
+    def absorb_file(self, name, transactions, **options):
+        path = os.path.join(self.directory, name)
+        if name.endswith('.parquet'):
+            transactions.to_parquet(path, index=False)
+        else:
+            transactions.to_csv(path, index=False)
+        call_command('absorb_transactions', path, stdout=io.StringIO(), **options)
+        return path
+
+    def test_absorb_matches_full_aggregate(self):
+        for bounds in np.array_split(np.arange(len(self.transactions)), 7):
+            absorb_transactions(self.transactions.iloc[bounds])
+        self.assert_state_matches(self.transactions)
+
+    def test_command_absorbs_csv_and_parquet_in_chunks(self):
+        self.absorb_file('first.csv', self.transactions.iloc[:300], chunksize=70)
+        self.absorb_file('second.parquet', self.transactions.iloc[300:], chunksize=70)
+        self.assert_state_matches(self.transactions)
+        self.assertEqual(sorted(AbsorbedFile.objects.values_list('Transaction_Count', flat=True)), [200, 300])
+
+    def test_command_refuses_a_file_twice(self):
+        path = self.absorb_file('transactions.parquet', self.transactions)
+        with self.assertRaisesMessage(CommandError, 'already been absorbed'):
+            call_command('absorb_transactions', path, stdout=io.StringIO())
+        self.assert_state_matches(self.transactions)
+
+    def test_command_failure_leaves_the_state_unchanged(self):
+        self.absorb_file('first.csv', self.transactions.iloc[:300])
+        broken = self.transactions.iloc[300:].astype({'Amount': object})
+        broken.iloc[-1, broken.columns.get_loc('Amount')] = 'not a number'
+        with self.assertRaises(CommandError):
+            self.absorb_file('broken.csv', broken, chunksize=50)
+        self.assert_state_matches(self.transactions.iloc[:300])
+        self.assertEqual(AbsorbedFile.objects.count(), 1)
+
+
+class _ExitOnLoad:
+    # Unpickling it ends the process, like a worker killed while loading the model
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+class ScorePortfolioTests(ServedModelMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.paths = {
+            'MODEL_PATH': os.path.join(self.directory, 'model.pkl'),
+            'PREPROCESSOR_PATH': os.path.join(self.directory, 'preprocessing.pkl'),
+            'VOCABULARY_PATH': os.path.join(self.directory, 'vocabulary.npz'),
+        }
+        joblib.dump(self.model, self.paths['MODEL_PATH'])
+        joblib.dump(ENCODER_ARTIFACT, self.paths['PREPROCESSOR_PATH'])
+
+        self.input_path = os.path.join(self.directory, 'features.csv')
+        pd.DataFrame(self.records).assign(TransactionId=lambda df: [f'TransactionId_{i}' for i in df.index]).to_csv(self.input_path, index=False)
+
+    def score_portfolio(self, **options):
+        output_path = os.path.join(self.directory, 'scores.csv')
+        with override_settings(**self.paths):
+            call_command('score_portfolio', self.input_path, output_path, stdout=io.StringIO(), **options)
+        return pd.read_csv(output_path)
+
+    def test_scores_every_row(self):
+        scores = self.score_portfolio(chunksize=60, workers=1)
+        self.assertEqual(list(scores['row']), list(range(len(self.records))))
+        self.assertEqual(list(scores['TransactionId']), [f'TransactionId_{i}' for i in range(len(self.records))])
+        np.testing.assert_allclose(scores['probability'], self.expected_probabilities(self.records), rtol=1e-5)
+        self.assertTrue(scores['errors'].isna().all())
+
+    def test_broken_pool_names_the_chunk(self):
+        joblib.dump(_ExitOnLoad(), self.paths['MODEL_PATH'])
+        with self.assertRaisesRegex(CommandError, r'terminated abruptly while scoring chunk 0 \(rows 0 to 59\)'):
+            self.score_portfolio(chunksize=60, workers=2)
+
+
+class FeatureViewTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        Feature.objects.bulk_create([
+            Feature(**feature_record(ProviderId=i % 3), Prediction='No Risk', Created_At=created_at.replace(day=i + 1))
+            for i in range(7)
+        ])
+
+    def test_cursor_pagination_walks_every_row_once(self):
+        seen = []
+        with mock.patch.object(FeaturePagination, 'page_size', 3):
+            url = '/features/'
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                seen += [row['id'] for row in response.json()['results']]
+                url = response.json()['next']
+        self.assertEqual(seen, sorted(Feature.objects.values_list('id', flat=True), reverse=True))
+
+    def test_filters(self):
+        response = self.client.get('/features/', {'ProviderId': 1, 'created_after': '2024-01-03', 'created_before': '2024-01-06T00:00:00Z'})
+        self.assertEqual(response.status_code, 200)
+        expected = Feature.objects.filter(
+            ProviderId=1, Created_At__gte=datetime(2024, 1, 3, tzinfo=timezone.utc), Created_At__lt=datetime(2024, 1, 6, tzinfo=timezone.utc),
+        )
+        self.assertEqual([row['id'] for row in response.json()['results']], sorted((f.id for f in expected), reverse=True))
+
+    def test_invalid_filters_are_rejected(self):
+        for params in ({'ProviderId': 'x'}, {'created_after': 'garbage'}, {'created_before': '2024-13-01'}):
+            self.assertEqual(self.client.get('/features/', params).status_code, 400, params)
+
+
+class PredictionLogTests(SimpleTestCase):
+
+    def test_batches_are_bounded_by_size(self):
+        writer = PredictionLogWriter(batch_size=4, flush_interval=10)
+        for i in range(10):
+            writer._queue.put(i)
+        self.assertEqual(writer._next_batch(), [0, 1, 2, 3])
+
+    def test_first_record_waits_at_most_flush_interval(self):
+        writer = PredictionLogWriter(batch_size=1000, flush_interval=0.2)
+        stop = threading.Event()
+
+        def trickle():
+            # A record every 50ms never lets the queue run empty for a whole flush_interval
+            while not stop.wait(0.05):
+                writer._queue.put('record')
+        feeder = threading.Thread(target=trickle)
+        feeder.start()
+        self.addCleanup(feeder.join)
+        self.addCleanup(stop.set)
+
+        writer._queue.put('first')
+        start = time.monotonic()
+        batch = writer._next_batch()
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(batch[0], 'first')
+
+
+class PredictionCacheTests(SimpleTestCase):
+
+    def score_fn(self, calls):
+        def score(model, X):
+            calls.append(len(X))
+            probabilities = X[:, 0].astype(np.float64)
+            return [model] * len(X), probabilities
+        return score
+
+    def test_hits_and_version_invalidation(self):
+        cache = PredictionCache(max_size=100, ttl=60)
+        X = np.arange(12, dtype=np.float32).reshape(4, 3)
+        calls = []
+        first = LoadedArtifact('v1', 'v1', datetime.now(timezone.utc), 'model.pkl')
+
+        labels, _ = cache.score(first, X, self.score_fn(calls))
+        cache.score(first, X, self.score_fn(calls))
+        self.assertEqual(calls, [4])
+        self.assertEqual(labels, ['v1'] * 4)
+
+        # A new model version never serves the predictions of the previous one
+        second = first._replace(obj='v2', version='v2')
+        labels, _ = cache.score(second, X[:2], self.score_fn(calls))
+        self.assertEqual(calls, [4, 2])
+        self.assertEqual(labels, ['v2'] * 2)
+        self.assertEqual(cache.info()['size'], 2)
+
+    def test_only_the_missing_rows_are_scored(self):
+        cache = PredictionCache(max_size=100, ttl=60)
+        X = np.arange(12, dtype=np.float32).reshape(4, 3)
+        calls = []
+        artifact = LoadedArtifact('v1', 'v1', datetime.now(timezone.utc), 'model.pkl')
+
+        cache.score(artifact, X[:2], self.score_fn(calls))
+        _, probabilities = cache.score(artifact, X, self.score_fn(calls))
+        self.assertEqual(calls, [2, 2])
+        np.testing.assert_array_equal(probabilities, X[:, 0])
+
+
+class ScoringPayloadTests(ServedModelMixin, TestCase):
+    '''
+    The prediction, probability and points returned for single records
+    '''
+
+    def setUp(self):
+        super().setUp()
+        feature_store.clear()
+        self.addCleanup(feature_store.clear)
+
+    def expected_payload(self, record) -> dict:
+        [probability] = self.expected_probabilities([record])
+        # 600 points at odds 1:19, 50 points less every time the odds of being risky double
+        points = round(600 - 50 / math.log(2) * math.log(probability / (1 - probability) * 19))
+        return {
+            'prediction': 'Has Risk' if probability > 0.5 else 'No Risk',
+            'probability': probability,
+            'points': points,
+            'model_version': 'test-model',
+        }
+
+    def assert_payload(self, payload, expected):
+        self.assertAlmostEqual(payload.pop('probability'), expected.pop('probability'), places=6)
+        self.assertEqual(payload, expected)
+
+    def test_feature_payload(self):
+        for record in self.records[:20]:
+            response = self.client.post('/features/', record, format='json')
+            self.assertEqual(response.status_code, 200)
+            self.assert_payload(response.json(), self.expected_payload(record))
+
+    def test_transaction_payload(self):
+        history = pd.DataFrame({
+            'TransactionId': ['TransactionId_1', 'TransactionId_2', 'TransactionId_3'],
+            'CustomerId': ['CustomerId_known'] * 3,
+            'Amount': [500.0, 1500.0, 4000.0],
+            'TransactionStartTime': pd.to_datetime(['2024-01-01T08:00:00Z', '2024-01-02T09:00:00Z', '2024-01-03T10:00:00Z']),
+        })
+        absorb_transactions(history)
+
+        transaction = {
+            'CustomerId': 'CustomerId_known', 'ProviderId': 3, 'ProductId': 10, 'ProductCategory': 'utility_bill',
+            'ChannelId': 2, 'Amount': 2500.0, 'TransactionStartTime': '2024-02-03T14:00:00Z',
+        }
+        features = {
+            **transaction, 'Transaction_Hour': 14, 'Transaction_Day': 3, 'Transaction_Month': 2,
+            'Average_transaction_amount': history['Amount'].mean(), 'STD_Transaction_Amount': history['Amount'].std(),
+        }
+        response = self.client.post('/score/', transaction, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assert_payload(response.json(), {**self.expected_payload(features), 'known_customer': True})
+
+        # A new customer's history is the transaction alone
+        new_customer = {**transaction, 'CustomerId': 'CustomerId_new'}
+        features.update(Average_transaction_amount=2500.0, STD_Transaction_Amount=0.0)
+        response = self.client.post('/score/', new_customer, format='json')
+        self.assert_payload(response.json(), {**self.expected_payload(features), 'known_customer': False})
+
+    def test_threshold_table(self):
+        thresholds = [(0.2, 'Low'), (0.6, 'Medium'), (1.0, 'High')]
+        self.assertEqual(risk_labels(np.array([0.0, 0.2, 0.21, 0.6, 0.99]), thresholds), ['Low', 'Low', 'Medium', 'Medium', 'High'])
+
+        with override_settings(RISK_THRESHOLDS=thresholds):
+            response = self.client.post('/features/', self.records[0], format='json')
+        [probability] = self.expected_probabilities(self.records[:1])
+        self.assertEqual(response.json()['prediction'], risk_labels(np.array([probability]), thresholds)[0])
@@ -1,8 +1,12 @@
 from django.urls import path
 
-from .views import FeatureView
+from .views import FeatureView, BatchFeatureView, AsyncFeatureView, TransactionScoreView, ModelInfoView
 
 
 urlpatterns = [
     path('features/', FeatureView.as_view(), name='feature_view'),
+    path('features/batch/', BatchFeatureView.as_view(), name='batch_feature_view'),
+    path('features/async/', AsyncFeatureView.as_view(), name='async_feature_view'),
+    path('score/', TransactionScoreView.as_view(), name='transaction_score_view'),
+    path('model/', ModelInfoView.as_view(), name='model_info_view'),
 ]
\ No newline at end of file
@@ -1,58 +1,262 @@
+import json
+from collections.abc import Iterator
+from datetime import datetime, time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import JSONParser
 from .models import Feature
-from .serializers import FeatureSerializer
+from .serializers import FeatureSerializer, TransactionSerializer
+from .parsers import NDJSONParser, CSVParser
+from .batching import get_batcher
+from .cache import prediction_cache
+from .compiled_model import CompiledGradientBoosting
+from .feature_store import feature_store
+from .metrics import stage
+from .prediction_log import prediction_log
+from .registry import model_registry, preprocessor_registry, vocabulary_registry
+from .scoring import score_cached, score_records, scorecard_points
+
+def log_prediction(feature_data, label, probability, model_version):
+    if settings.PREDICTION_LOG_ENABLED:
+        prediction_log.log(feature_data, label, probability, model_version)
+
+
+def parse_timestamp(value: str):
+    '''
+    Parses an ISO 8601 datetime or date (midnight) query parameter, naive values are in TIME_ZONE
+
+    Raises:
+        ValueError if value is neither
+    '''
+    parsed = parse_datetime(value)
+    if parsed is None:
+        date = parse_date(value)
+        if date is None:
+            raise ValueError(f"'{value}' is not an ISO 8601 date or datetime")
+        parsed = datetime.combine(date, time.min)
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+class FeaturePagination(CursorPagination):
+    page_size = settings.FEATURE_PAGE_SIZE
+    ordering = '-id'
 
-import joblib
-import numpy as np
-import pandas as pd
-from sklearn.preprocessing import StandardScaler
 
 class FeatureView(APIView):
+    # Exact match filters of the GET endpoint, all of them are indexed
+    filter_fields = {
+        'ProductCategory': str,
+        'ProviderId': int,
+        'ChannelId': int,
+        'Prediction': str,
+    }
+    # Range filters on Created_At, ISO 8601 dates or datetimes
+    date_filters = {
+        'created_after': 'Created_At__gte',
+        'created_before': 'Created_At__lt',
+    }
+
     def get(self, request):
         features = Feature.objects.all()
-        serializer = FeatureSerializer(features, many=True)
-        return Response(serializer.data)
+        try:
+            filters = {
+                field: cast(request.query_params[field])
+                for field, cast in self.filter_fields.items() if field in request.query_params
+            }
+            for param, lookup in self.date_filters.items():
+                if param in request.query_params:
+                    filters[lookup] = parse_timestamp(request.query_params[param])
+        except ValueError as e:
+            return Response({'error': f'Invalid filter: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = FeaturePagination()
+        page = paginator.paginate_queryset(features.filter(**filters), request, view=self)
+        serializer = FeatureSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
-        serializer = FeatureSerializer(data=request.data)
-        if serializer.is_valid():
+        with stage('parse'):
+            data = request.data
+        with stage('validate'):
+            serializer = FeatureSerializer(data=data)
+            valid = serializer.is_valid()
+        if valid:
             feature_data = serializer.validated_data
          
-            input_data = pd.DataFrame({
-                'ProviderId': [feature_data['ProviderId']],
-                'ProductId': [feature_data['ProductId']],
-                'ChannelId': [feature_data['ChannelId']],
-                'Amount': [feature_data['Amount']],
-                'Transaction_Hour': [feature_data['Transaction_Hour']],
-                'Transaction_Day': [feature_data['Transaction_Day']],
-                'Average_transaction_amount': [feature_data['Average_transaction_amount']],
-                'STD_Transaction_Amount': [feature_data['STD_Transaction_Amount']],
-                'Transaction_Month': [feature_data['Transaction_Month']],
-                'ProductCategory_airtime': [feature_data['ProductCategory'] == 'airtime'],
-                'ProductCategory_data_bundles': [feature_data['ProductCategory'] == 'data_bundles'],
-                'ProductCategory_financial_services': [feature_data['ProductCategory'] == 'financial_services'],
-                'ProductCategory_movies': [feature_data['ProductCategory'] == 'movies'],
-                'ProductCategory_other': [feature_data['ProductCategory'] == 'other'],
-                'ProductCategory_ticket': [feature_data['ProductCategory'] == 'ticket'],
-                'ProductCategory_transport': [feature_data['ProductCategory'] == 'transport'],
-                'ProductCategory_tv': [feature_data['ProductCategory'] == 'tv'],
-                'ProductCategory_utility_bill': [feature_data['ProductCategory'] == 'utility_bill']
-            })
-
-            continuous_features = ['Amount', 'Transaction_Hour', 'Transaction_Day', 
-                                    'Average_transaction_amount', 'STD_Transaction_Amount', 'Transaction_Month']
-
-
-            scaler = StandardScaler()
-            input_data[continuous_features] = scaler.fit_transform(input_data[continuous_features])
-            
-            model = joblib.load('C:/Users/user/Documents/Programming/Kifiya_10X/Credit_Risk_Model/Models/GradientBoostingClassifier_model.pkl') 
-            prediction = model.predict(input_data)
-            if prediction == 0:
-                response = 'No Risk'
-            else:
-                response = 'Has Risk'
-            return Response({'prediction': response}, status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)    
\ No newline at end of file
+            artifact = model_registry.current
+            preprocessor = preprocessor_registry.current
+            if artifact is None or preprocessor is None:
+                return Response({'error': 'Model is not available'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+            with stage('encode'):
+                input_data = preprocessor.obj.encode([feature_data])
+            with stage('predict'):
+                [response], probabilities = score_cached(artifact, input_data)
+                [points] = scorecard_points(probabilities)
+            with stage('log'):
+                log_prediction(feature_data, response, float(probabilities[0]), artifact.version)
+            return Response({
+                'prediction': response,
+                'probability': float(probabilities[0]),
+                'points': int(points),
+                'model_version': artifact.version,
+            }, status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class BatchFeatureView(APIView):
+    '''
+    Scores many feature records in one call.
+
+    Accepts a JSON array, NDJSON (application/x-ndjson) or CSV (text/csv) body and
+    streams back one NDJSON line per record with its risk label, probability and points.
+    NDJSON and CSV bodies are parsed as they stream, so a malformed line ends the response
+    with an error line, after the results of every record before it.
+    '''
+    parser_classes = [JSONParser, NDJSONParser, CSVParser]
+
+    def post(self, request):
+        records = request.data
+        # A JSON array, or the lazy record iterator of the NDJSON and CSV parsers
+        if not isinstance(records, (list, Iterator)):
+            return Response({'error': 'Expected a list of feature records'}, status=status.HTTP_400_BAD_REQUEST)
+
+        artifact = model_registry.current
+        preprocessor = preprocessor_registry.current
+        if artifact is None or preprocessor is None:
+            return Response({'error': 'Model is not available'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        results = score_records(
+            records, artifact, preprocessor.obj, chunk_size=settings.BATCH_CHUNK_SIZE,
+            prediction_log=prediction_log if settings.PREDICTION_LOG_ENABLED else None,
+        )
+        response = StreamingHttpResponse(self._ndjson(results), content_type='application/x-ndjson')
+        response['X-Model-Version'] = artifact.version
+        return response
+
+    def _ndjson(self, results):
+        try:
+            for result in results:
+                yield json.dumps(result) + '\n'
+        except ParseError as e:
+            # The body is parsed lazily, so malformed input surfaces mid-stream
+            yield json.dumps({'error': str(e.detail)}) + '\n'
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncFeatureView(View):
+    '''
+    Async version of FeatureView.post for ASGI deployments.
+
+    Concurrent requests are coalesced by a MicroBatcher and scored together in a thread pool,
+    so a burst of single-row requests costs a few model calls instead of one each.
+    Validation and the registry reads run in worker threads too, the event loop never touches disk.
+    '''
+
+    async def post(self, request):
+        try:
+            with stage('parse'):
+                data = json.loads(request.body)
+        except ValueError as e:
+            return JsonResponse({'error': f'JSON parse error - {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer, valid, available = await sync_to_async(self._validate, thread_sensitive=False)(data)
+        if not valid:
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if not available:
+            return JsonResponse({'error': 'Model is not available'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        with stage('batch_wait'):
+            label, probability, points, version = await get_batcher().submit(serializer.validated_data)
+        with stage('log'):
+            log_prediction(serializer.validated_data, label, probability, version)
+        return JsonResponse({'prediction': label, 'probability': probability, 'points': points, 'model_version': version})
+
+    @staticmethod
+    def _validate(data):
+        '''
+        Validates the record and checks the artifacts are loaded. Reading a registry can load an
+        artifact from disk (and raw ids read the vocabulary), so this runs in a worker thread
+        instead of stalling every request waiting on the event loop
+
+        Returns:
+            (serializer, is valid, model available)
+        '''
+        with stage('validate'):
+            serializer = FeatureSerializer(data=data)
+            valid = serializer.is_valid()
+        available = valid and model_registry.current is not None and preprocessor_registry.current is not None
+        return serializer, valid, available
+
+
+class TransactionScoreView(APIView):
+    '''
+    Scores a raw transaction of a customer.
+
+    The customer's Average_transaction_amount and STD_Transaction_Amount come from the
+    online feature store, so clients only send the CustomerId and the transaction.
+    '''
+
+    def post(self, request):
+        with stage('parse'):
+            data = request.data
+        with stage('validate'):
+            serializer = TransactionSerializer(data=data)
+            valid = serializer.is_valid()
+        if not valid:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        transaction = serializer.validated_data
+
+        artifact = model_registry.current
+        encoder = preprocessor_registry.current
+        if artifact is None or encoder is None:
+            return Response({'error': 'Model is not available'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        with stage('feature_store'):
+            aggregates = feature_store.get(transaction['CustomerId'])
+        known_customer = aggregates is not None
+        if not known_customer:
+            # A new customer's history is this transaction alone
+            aggregates = {'Average_transaction_amount': transaction['Amount'], 'STD_Transaction_Amount': 0.0}
+
+        features = {**transaction, **aggregates}
+        with stage('encode'):
+            input_data = encoder.obj.encode([features])
+        with stage('predict'):
+            [label], probabilities = score_cached(artifact, input_data)
+            [points] = scorecard_points(probabilities)
+        with stage('log'):
+            log_prediction(features, label, float(probabilities[0]), artifact.version)
+        return Response({
+            'prediction': label,
+            'probability': float(probabilities[0]),
+            'points': int(points),
+            'known_customer': known_customer,
+            'model_version': artifact.version,
+        }, status=status.HTTP_200_OK)
+
+
+class ModelInfoView(APIView):
+    def get(self, request):
+        info = model_registry.info()
+        info['compiled'] = isinstance(getattr(model_registry.current, 'obj', None), CompiledGradientBoosting)
+        info['preprocessor'] = preprocessor_registry.info()
+        info['vocabulary'] = vocabulary_registry.info()
+        info['feature_store'] = feature_store.info()
+        info['prediction_log'] = prediction_log.info()
+        info['prediction_cache'] = prediction_cache.info() if prediction_cache is not None else None
+        info['risk_thresholds'] = settings.RISK_THRESHOLDS
+        return Response(info)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+
+# The id features of the model, the only columns with a vocabulary at serving time
+ID_COLUMNS = ['ProviderId', 'ProductId', 'ChannelId']
+
+
+def parse_number(value):
+    '''
+    The float of a number or of its text ('5', '5.0', '1e3', 'nan'), None for anything else such as a raw id
+    '''
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Vocabulary:
+    '''
+    The id/category vocabularies exported from Feature_Engineering.ipynb
+    (see VocabularyEncoder in scripts/Vocabulary.py), turning raw ids such as
+    'ProviderId_6' into the integer codes the model was trained on.
+
+    Every vocabulary is kept as a pandas Index, so encoding is one hash lookup per value.
+    Ids that were not seen in training get the unseen bucket code len(vocabulary).
+
+    Parameters:
+    -----------
+        file: path or file object of the .npz vocabulary file
+    '''
+
+    def __init__(self, file):
+        # Only the id features of the model are read, the arrays of an .npz file are loaded one by one
+        with np.load(file, allow_pickle=False) as stored:
+            self.columns = [col for col in stored['__columns__'].tolist() if col in ID_COLUMNS]
+            self._indexes = {col: pd.Index(stored[col]) for col in self.columns}
+
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._indexes
+
+
+    def code(self, column: str, value) -> int:
+        '''
+        Code of a single raw value of column, len(vocabulary) if it was not seen in training
+        '''
+        index = self._indexes[column]
+        try:
+            return int(index.get_loc(str(value)))
+        except KeyError:
+            return len(index)
+
+
+    def encode(self, column: str, values) -> np.ndarray:
+        '''
+        Codes of the raw values of column, unseen and missing values get len(vocabulary)
+
+        Returns:
+            np.ndarray of int32
+        '''
+        index = self._indexes[column]
+        codes = index.get_indexer(pd.Index(values).astype(str))
+        return np.where(codes >= 0, codes, len(index)).astype(np.int32)
+
+
+    def encode_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        '''
+        Replaces the raw ids of frame by their codes with the rule of EncodedIdField: numbers,
+        also written as text ('5', '5.0', '1e3'), are codes already and missing values stay
+        missing, so that validate_frame rejects them like the API does
+
+        Returns:
+            pd.DataFrame
+        '''
+        encoded = {}
+        for col in self.columns:
+            if col not in frame or pd.api.types.is_numeric_dtype(frame[col]):
+                continue
+            values = frame[col].astype(object)
+            # The distinct values are parsed once, an id column has few of them
+            numbers = {value: parse_number(value) for value in pd.unique(values.dropna())}
+            raw = [value for value, number in numbers.items() if number is None]
+            numbers.update(zip(raw, self.encode(col, raw).tolist()))
+            encoded[col] = values.map(numbers).astype(np.float64)
+        return frame.assign(**encoded) if encoded else frame
+
+
+    def info(self) -> dict:
+        return {col: len(index) for col, index in self._indexes.items()}
@@ -0,0 +1,69 @@
+'''
+Benchmark of FeatureEngineering.aggregate_features (one fused pass over factorized
+CustomerId codes) against the previous four groupby/transform passes.
+
+Reports runtime and peak memory allocated during the aggregation (tracemalloc).
+
+Usage (from the repository root):
+    python benchmarks/bench_aggregate.py [n_rows]
+
+n_rows defaults to 100000, the largest size of benchmarks/run.py.
+'''
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scripts')))
+
+from Preprocessor import FeatureEngineering
+from synthetic import make_transactions
+
+
+AGGREGATE_COLUMNS = ['Total_transaction_amount', 'Average_transaction_amount', 'Transaction_Count', 'STD_Transaction_Amount']
+
+
+def legacy_aggregate_features(data):
+    '''
+    The previous implementation: one groupby/transform per statistic
+    '''
+    data['Total_transaction_amount'] = data.groupby(by='CustomerId')['Amount'].transform("sum")
+    data['Average_transaction_amount'] = data.groupby(by='CustomerId')['Amount'].transform("mean")
+    data['Transaction_Count'] = data.groupby(by='CustomerId')['TransactionId'].transform('size')
+    data['STD_Transaction_Amount'] = data.groupby(by='CustomerId')['Amount'].transform('std')
+
+
+def profile(func, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main(n_rows=100_000):
+    data = make_transactions(n_rows, columns=['TransactionId', 'CustomerId', 'Amount'])
+    print(f"{n_rows} transactions, {data['CustomerId'].nunique()} customers")
+
+    legacy = data.copy()
+    legacy_seconds, legacy_peak = profile(legacy_aggregate_features, legacy)
+    print(f"{'4 x groupby/transform':<30}: {legacy_seconds:7.2f} s, peak {legacy_peak / 2**20:8.1f} MiB")
+
+    for compact in [False, True]:
+        feature_engineer = FeatureEngineering(data.copy())
+        seconds, peak = profile(feature_engineer.aggregate_features, compact=compact)
+        print(f"{f'fused (compact={compact})':<30}: {seconds:7.2f} s, peak {peak / 2**20:8.1f} MiB ({legacy_seconds / seconds:.1f}x)")
+
+        for col in AGGREGATE_COLUMNS:
+            np.testing.assert_allclose(
+                feature_engineer.data[col].to_numpy(dtype=np.float64), legacy[col].to_numpy(dtype=np.float64),
+                rtol=1e-6 if compact else 1e-9,
+            )
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,102 @@
+'''
+Micro-benchmark of the feature encoding done by the scoring API.
+
+Compares the per-request pd.DataFrame construction that FeatureView.post used to do
+with the compiled FeatureEncoder, for a single row and for a batch.
+
+Usage (from the repository root):
+    python benchmarks/bench_feature_encoder.py
+'''
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Model_Backend')))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Model_Api.settings')
+
+import django
+django.setup()
+
+from apis.encoding import FeatureEncoder, TRAINING_COLUMNS
+
+
+CONTINUOUS_FEATURES = ['Amount', 'Transaction_Hour', 'Transaction_Day',
+                       'Average_transaction_amount', 'STD_Transaction_Amount', 'Transaction_Month']
+
+CATEGORIES = ['airtime', 'data_bundles', 'financial_services', 'movies', 'other', 'ticket', 'transport', 'tv', 'utility_bill']
+
+
+def make_artifact():
+    return {
+        'columns': TRAINING_COLUMNS,
+        'continuous_features': CONTINUOUS_FEATURES,
+        'mean': np.array([6717.8, 12.4, 15.9, 6717.8, 3220.5, 6.6]),
+        'scale': np.array([123306.8, 4.8, 8.8, 55000.2, 76001.3, 5.2]),
+        'categories': {'ProductCategory': CATEGORIES},
+    }
+
+
+def make_records(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{
+        'ProviderId': int(rng.integers(1, 7)),
+        'ProductId': int(rng.integers(1, 28)),
+        'ProductCategory': str(rng.choice(CATEGORIES)),
+        'ChannelId': int(rng.integers(1, 6)),
+        'Amount': float(rng.normal(1000, 5000)),
+        'Transaction_Hour': int(rng.integers(0, 24)),
+        'Transaction_Day': int(rng.integers(1, 32)),
+        'Average_transaction_amount': float(rng.normal(1000, 3000)),
+        'STD_Transaction_Amount': float(abs(rng.normal(2000, 3000))),
+        'Transaction_Month': int(rng.integers(1, 13)),
+    } for _ in range(n_rows)]
+
+
+def dataframe_encode(records, artifact):
+    '''
+    The encoding FeatureView.post used to do, with the exported scaler statistics
+    '''
+    input_data = pd.DataFrame({
+        'ProviderId': [r['ProviderId'] for r in records],
+        'ProductId': [r['ProductId'] for r in records],
+        'ChannelId': [r['ChannelId'] for r in records],
+        'Amount': [r['Amount'] for r in records],
+        'Transaction_Hour': [r['Transaction_Hour'] for r in records],
+        'Transaction_Day': [r['Transaction_Day'] for r in records],
+        'Average_transaction_amount': [r['Average_transaction_amount'] for r in records],
+        'STD_Transaction_Amount': [r['STD_Transaction_Amount'] for r in records],
+        'Transaction_Month': [r['Transaction_Month'] for r in records],
+        **{f'ProductCategory_{c}': [r['ProductCategory'] == c for r in records] for c in CATEGORIES},
+    })
+    input_data[CONTINUOUS_FEATURES] = (input_data[CONTINUOUS_FEATURES] - artifact['mean']) / artifact['scale']
+    return input_data.to_numpy(dtype=np.float32)
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{label:<40}: {seconds * 1e6:10.1f} us")
+    return seconds
+
+
+def main():
+    artifact = make_artifact()
+    encoder = FeatureEncoder(artifact)
+
+    for n_rows, number in [(1, 2000), (1000, 20)]:
+        records = make_records(n_rows)
+        buffer = encoder.allocate(n_rows)
+
+        # Both paths must produce the same matrix
+        np.testing.assert_array_equal(dataframe_encode(records, artifact), encoder.encode(records))
+
+        print(f"\n{n_rows} row(s)")
+        legacy = bench('pd.DataFrame', lambda: dataframe_encode(records, artifact), number)
+        compiled = bench('FeatureEncoder (preallocated buffer)', lambda: encoder.encode(records, out=buffer), number)
+        print(f"{'speedup':<40}: {legacy / compiled:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+'''
+Benchmark of WoE.calculate_woe_iv against the previous per-bin boolean mask implementation,
+and of WoE.compute_iv against the previous feature by feature loop.
+
+Usage (from the repository root):
+    python benchmarks/bench_woe.py [n_rows] [n_features]
+'''
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scripts')))
+
+from Utils import WoE
+from synthetic import make_binned
+
+
+def legacy_calculate_woe_iv(dataset, feature, target):
+    '''
+    The previous implementation: three full-frame boolean filters per distinct bin
+    '''
+    lst = []
+    for i in range(dataset[feature].nunique()):
+        val = list(dataset[feature].unique())[i]
+        lst.append({
+            'Bin Values': val,
+            'All': dataset[dataset[feature] == val].count()[feature],
+            'Good': dataset[(dataset[feature] == val) & (dataset[target] == 0)].count()[feature],
+            'Bad': dataset[(dataset[feature] == val) & (dataset[target] == 1)].count()[feature]
+        })
+    dset = pd.DataFrame(lst)
+    dset['Distr_Good'] = dset['Good'] / dset['Good'].sum()
+    dset['Distr_Bad'] = dset['Bad'] / dset['Bad'].sum()
+    dset['WoE'] = np.log(dset['Distr_Good'] / dset['Distr_Bad'])
+    dset = dset.replace({'WoE': {np.inf: 0, -np.inf: 0}})
+    dset['IV'] = (dset['Distr_Good'] - dset['Distr_Bad']) * dset['WoE']
+    iv = dset['IV'].sum()
+    dset = dset.sort_values(by='WoE')
+    return dset, iv
+
+
+def legacy_compute_iv(train_bins):
+    '''
+    The previous implementation: one calculate_woe_iv call and one pd.concat per feature
+    '''
+    IV_df = pd.DataFrame(columns=['Variable','IV'])
+    for col in train_bins.columns:
+        if col == 'RiskResult': continue
+        _, iv = legacy_calculate_woe_iv(train_bins, col, 'RiskResult')
+        IV_df = pd.concat([IV_df, pd.DataFrame({"Variable": [col], "IV": [iv]})], ignore_index=True)
+    return IV_df
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_calculate_woe_iv(n_rows):
+    woe = WoE()
+    data = make_binned(n_rows, n_features=10, n_bins=20)
+    features = [col for col in data.columns if col != 'RiskResult']
+
+    legacy_total = vectorized_total = 0
+    for feature in features:
+        (expected, expected_iv), legacy_seconds = timed(legacy_calculate_woe_iv, data, feature, 'RiskResult')
+        (result, iv), vectorized_seconds = timed(woe.calculate_woe_iv, data, feature, 'RiskResult')
+
+        pd.testing.assert_frame_equal(result, expected)
+        assert iv == expected_iv
+
+        legacy_total += legacy_seconds
+        vectorized_total += vectorized_seconds
+
+    print(f"{n_rows} rows x {len(features)} features")
+    print(f"{'per-bin boolean masks':<25}: {legacy_total:8.3f} s")
+    print(f"{'factorize + bincount':<25}: {vectorized_total:8.3f} s")
+    print(f"{'speedup':<25}: {legacy_total / vectorized_total:8.1f}x")
+
+
+def bench_compute_iv(n_rows, n_features):
+    woe = WoE()
+    data = make_binned(n_rows, n_features=n_features, n_bins=20)
+
+    expected, legacy_seconds = timed(legacy_compute_iv, data)
+    print(f"\ncompute_iv: {n_rows} rows x {n_features} features")
+    print(f"{'feature by feature':<25}: {legacy_seconds:8.3f} s")
+
+    for n_jobs in sorted({1, os.cpu_count() or 1}):
+        (IV_df, woe_tables), seconds = timed(woe.compute_iv, data, n_jobs=n_jobs)
+        np.testing.assert_array_equal(IV_df['IV'].to_numpy(), expected['IV'].to_numpy(dtype=np.float64))
+        assert len(woe_tables) == n_features
+        print(f"{f'single pass, n_jobs={n_jobs}':<25}: {seconds:8.3f} s ({legacy_seconds / seconds:.1f}x)")
+
+
+def main(n_rows=100_000, n_features=50):
+    bench_calculate_woe_iv(n_rows)
+    bench_compute_iv(n_rows // 5, n_features)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
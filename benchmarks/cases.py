@@ -0,0 +1,177 @@
+'''
+The hot functions timed by benchmarks/run.py.
+
+Every case takes the number of rows and the seed, prepares its input outside of the
+measurement and returns (func, n_items): func is the call that is timed and profiled,
+n_items what the throughput is computed on (rows, or requests for the API cases).
+A func doing its work in a subprocess returns the peak memory (bytes) it measured there,
+since tracemalloc only sees the allocations of this process.
+'''
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(ROOT, 'scripts'))
+
+from synthetic import make_binned, make_transactions
+
+
+# The API cases send at most this many requests, whatever the number of rows
+MAX_REQUESTS = 2000
+
+# Files written by the cases, removed when the run ends
+_scratch = tempfile.TemporaryDirectory(prefix='bench-')
+
+
+# Modules a batch job or API worker imports from scripts/, and the plotting libraries they must not pull in
+CORE_MODULES = ['Utils', 'Preprocessor', 'RFMS', 'Modelling', 'Vocabulary']
+PLOTTING_MODULES = ['matplotlib', 'seaborn', 'missingno', 'scorecardpy', 'statsmodels']
+
+
+def import_core(n_rows: int, seed: int):
+    # A fresh interpreter per run, so nothing is already imported; includes the interpreter startup.
+    # The imports happen in the child, so during the memory run its own tracemalloc peak is reported back
+    code = (
+        'import sys, tracemalloc\n'
+        'profile = "--peak" in sys.argv\n'
+        'if profile: tracemalloc.start()\n'
+        f'sys.path.insert(0, {os.path.join(ROOT, "scripts")!r})\n'
+        f'import {", ".join(CORE_MODULES)}\n'
+        f'loaded = [name for name in {PLOTTING_MODULES!r} if name in sys.modules]\n'
+        'assert not loaded, f"importing the core modules loaded {loaded}"\n'
+        'if profile: print(tracemalloc.get_traced_memory()[1])\n'
+    )
+
+    def run():
+        profile = tracemalloc.is_tracing()
+        result = subprocess.run(
+            [sys.executable, '-c', code, *(['--peak'] if profile else [])],
+            check=True, cwd=_scratch.name, capture_output=True, text=True,
+        )
+        return int(result.stdout) if profile else None
+    return run, len(CORE_MODULES)
+
+
+def woe_compute_iv(n_rows: int, seed: int):
+    from Utils import WoE
+    data = make_binned(n_rows, n_features=20, n_bins=20, seed=seed)
+    woe = WoE()
+    return lambda: woe.compute_iv(data), n_rows
+
+
+def aggregate_features(n_rows: int, seed: int):
+    from Preprocessor import FeatureEngineering
+    data = make_transactions(n_rows, seed=seed, columns=['TransactionId', 'CustomerId', 'Amount'])
+
+    def run():
+        FeatureEngineering(data.copy()).aggregate_features()
+    return run, n_rows
+
+
+def _load_data(file_format: str, schema: bool = False):
+    def case(n_rows: int, seed: int):
+        from Utils import DataUtils, TRANSACTION_SCHEMA
+        data = make_transactions(n_rows, seed=seed)
+        # load_data reads from ../data/, so the file goes to <scratch>/data and is read from <scratch>/notebooks
+        os.makedirs(os.path.join(_scratch.name, 'data'), exist_ok=True)
+        os.makedirs(os.path.join(_scratch.name, 'notebooks'), exist_ok=True)
+        file_name = f'transactions_{n_rows}.{file_format}'
+        getattr(data, f'to_{file_format}')(os.path.join(_scratch.name, 'data', file_name), index=False)
+
+        data_utils = DataUtils()
+
+        def run():
+            cwd = os.getcwd()
+            os.chdir(os.path.join(_scratch.name, 'notebooks'))
+            try:
+                data_utils.load_data(file_name, schema=TRANSACTION_SCHEMA if schema else None)
+            finally:
+                os.chdir(cwd)
+        return run, n_rows
+    return case
+
+
+def _django():
+    sys.path.append(os.path.join(ROOT, 'Model_Backend'))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Model_Api.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.ALLOWED_HOSTS = ['testserver']
+    # Nothing is written to the database while benchmarking
+    settings.PREDICTION_LOG_ENABLED = False
+
+
+def _feature_records(n_rows: int, seed: int) -> list:
+    data = make_transactions(n_rows, seed=seed, columns=['ProviderId', 'ProductId', 'ProductCategory', 'ChannelId', 'Amount'])
+    rng = np.random.default_rng(seed)
+    return [{
+        'ProviderId': int(row.ProviderId.rsplit('_', 1)[1]),
+        'ProductId': int(row.ProductId.rsplit('_', 1)[1]),
+        'ProductCategory': row.ProductCategory,
+        'ChannelId': int(row.ChannelId.rsplit('_', 1)[1]),
+        'Amount': float(row.Amount),
+        'Transaction_Hour': int(hour),
+        'Transaction_Day': int(day),
+        'Average_transaction_amount': float(row.Amount),
+        'STD_Transaction_Amount': float(std),
+        'Transaction_Month': int(month),
+    } for row, hour, day, std, month in zip(
+        data.itertuples(), rng.integers(0, 24, n_rows), rng.integers(1, 32, n_rows),
+        np.abs(rng.normal(2000, 3000, n_rows)), rng.integers(1, 13, n_rows),
+    )]
+
+
+def api_features_post(n_rows: int, seed: int):
+    _django()
+    from rest_framework.test import APIClient
+    from apis.cache import prediction_cache
+    from apis.registry import model_registry, preprocessor_registry
+    if model_registry.current is None or preprocessor_registry.current is None:
+        raise RuntimeError('the model and preprocessing artifacts are not in Models/')
+
+    client = APIClient()
+    records = _feature_records(min(n_rows, MAX_REQUESTS), seed)
+
+    def run():
+        # Every repetition scores the model, not the prediction cache
+        if prediction_cache is not None:
+            prediction_cache.clear()
+        for record in records:
+            client.post('/features/', record, format='json')
+    return run, len(records)
+
+
+def api_score_records(n_rows: int, seed: int):
+    _django()
+    from apis.cache import prediction_cache
+    from apis.registry import model_registry, preprocessor_registry
+    from apis.scoring import score_records
+    if model_registry.current is None or preprocessor_registry.current is None:
+        raise RuntimeError('the model and preprocessing artifacts are not in Models/')
+
+    records = _feature_records(n_rows, seed)
+
+    def run():
+        if prediction_cache is not None:
+            prediction_cache.clear()
+        for _ in score_records(records, model_registry.current, preprocessor_registry.current.obj):
+            pass
+    return run, n_rows
+
+
+BENCHMARKS = {
+    'import scripts core': import_core,
+    'WoE.compute_iv': woe_compute_iv,
+    'FeatureEngineering.aggregate_features': aggregate_features,
+    'DataUtils.load_data[csv]': _load_data('csv'),
+    'DataUtils.load_data[csv, schema]': _load_data('csv', schema=True),
+    'DataUtils.load_data[parquet]': _load_data('parquet'),
+    'POST /features/': api_features_post,
+    'apis.scoring.score_records': api_score_records,
+}
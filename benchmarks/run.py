@@ -0,0 +1,146 @@
+'''
+Runs the benchmark cases of benchmarks/cases.py on seeded synthetic data, writes the
+timings and peak memory to a JSON file and compares them with a stored baseline.
+
+Every case is timed `repeat` times, then run once more under tracemalloc for its peak
+memory, so profiling does not slow down the timed runs (a case running in a subprocess
+measures the peak of the subprocess).
+
+Usage (from the repository root or benchmarks/):
+    python benchmarks/run.py --sizes 10000 100000 1000000
+    python benchmarks/run.py --save-baseline benchmarks/results/baseline.json
+    python benchmarks/run.py --only WoE load_data --baseline benchmarks/results/baseline.json
+
+The results go to benchmarks/results/latest.json unless --output is given. With
+--baseline the exit code is 1 when a case regressed by more than --tolerance.
+'''
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cases import BENCHMARKS
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def measure(case, n_rows: int, seed: int, repeat: int) -> dict:
+    func, n_items = case(n_rows, seed)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    measured = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Cases running in a subprocess report the peak of the subprocess in bytes
+    if isinstance(measured, int):
+        peak = measured
+
+    best = min(timings)
+    return {
+        'n_rows': n_rows,
+        'n_items': n_items,
+        'seconds_min': best,
+        'seconds_median': statistics.median(timings),
+        'items_per_second': n_items / best,
+        'peak_mib': peak / 2**20,
+    }
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    '''
+    Compares the results with the baseline, matched on the case and the number of rows
+
+    Returns:
+        list of the regressions: cases slower or using more memory than the baseline by more than tolerance
+    '''
+    previous = {(r['name'], r['n_rows']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        base = previous.get((result['name'], result['n_rows']))
+        if base is None or 'error' in result or 'error' in base:
+            continue
+        result['time_ratio'] = result['seconds_min'] / base['seconds_min']
+        result['memory_ratio'] = result['peak_mib'] / base['peak_mib'] if base['peak_mib'] else 1.0
+        if result['time_ratio'] > 1 + tolerance or result['memory_ratio'] > 1 + tolerance:
+            regressions.append(result)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000], help='numbers of rows, from 10k to 10M')
+    parser.add_argument('--only', nargs='+', help='run the cases whose name contains one of these')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'latest.json'), help='JSON file the results are written to')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown or memory growth over the baseline')
+    parser.add_argument('--save-baseline', help='also write the results to this file, to compare later runs with')
+    args = parser.parse_args(argv)
+    # The model was fitted on a DataFrame and is scored with arrays, sklearn warns on every call
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+    names = [name for name in BENCHMARKS if not args.only or any(part in name for part in args.only)]
+    results = []
+    for name in names:
+        for n_rows in args.sizes:
+            try:
+                result = {'name': name, **measure(BENCHMARKS[name], n_rows, args.seed, args.repeat)}
+                print(f"{name:<40} {n_rows:>10} rows: {result['seconds_min']:9.4f} s, "
+                      f"{result['items_per_second']:12.0f} /s, peak {result['peak_mib']:8.1f} MiB")
+            except Exception as e:
+                result = {'name': name, 'n_rows': n_rows, 'error': str(e)}
+                print(f"{name:<40} {n_rows:>10} rows: skipped ({e})")
+            results.append(result)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for result in results:
+            if 'time_ratio' in result:
+                flag = '  REGRESSION' if result in regressions else ''
+                print(f"{result['name']:<40} {result['n_rows']:>10} rows: time x{result['time_ratio']:.2f}, memory x{result['memory_ratio']:.2f}{flag}")
+        report['baseline'] = args.baseline
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
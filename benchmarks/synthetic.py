@@ -0,0 +1,89 @@
+'''
+Seeded synthetic data with the schema of the Xente transaction file (data/data.csv),
+so the benchmarks do not depend on the DVC tracked data.
+'''
+import numpy as np
+import pandas as pd
+
+
+PRODUCT_CATEGORIES = ['airtime', 'financial_services', 'utility_bill', 'data_bundles', 'tv', 'ticket', 'movies', 'transport', 'other']
+
+# Share of each category in the original data
+CATEGORY_WEIGHTS = [0.47, 0.475, 0.02, 0.017, 0.013, 0.002, 0.002, 0.0007, 0.0003]
+
+
+def _ids(prefix: str, values: np.ndarray) -> pd.Series:
+    return prefix + '_' + pd.Series(values).astype(str)
+
+
+def make_transactions(n_rows: int, n_customers: int = None, seed: int = 42, columns: list = None) -> pd.DataFrame:
+    '''
+    Generates raw transactions shaped like data/data.csv
+
+    Parameters:
+    -----------
+        n_rows(int): number of transactions
+        n_customers(int): number of distinct customers, defaults to one per 25 transactions
+        seed(int): seed of the random generator
+        columns(list): only generate these columns, which keeps large frames cheap
+
+    Returns:
+        pd.DataFrame
+    '''
+    rng = np.random.default_rng(seed)
+    n_customers = n_customers or max(n_rows // 25, 1)
+
+    # A few customers make most of the transactions, like in the original data
+    customer = (rng.pareto(1.2, n_rows) * n_customers / 20).astype(np.int64) % n_customers
+    category = rng.choice(len(PRODUCT_CATEGORIES), n_rows, p=np.array(CATEGORY_WEIGHTS) / sum(CATEGORY_WEIGHTS))
+
+    amount = np.round(rng.lognormal(7, 1.6, n_rows), -1)
+    # Financial services are mostly credits (negative amounts)
+    amount = np.where((np.asarray(PRODUCT_CATEGORIES)[category] == 'financial_services') & (rng.random(n_rows) < 0.8), -amount, amount)
+
+    start = np.datetime64('2018-11-15T00:00:00')
+    seconds = np.sort(rng.integers(0, 90 * 24 * 3600, n_rows))
+
+    # Each column is generated only when requested, from its own generator so a
+    # column has the same values whichever other columns are requested
+    generators = {
+        'TransactionId': lambda r: _ids('TransactionId', r.permutation(n_rows) + 1),
+        'BatchId': lambda r: _ids('BatchId', r.integers(1, max(n_rows, 2), n_rows)),
+        'AccountId': lambda r: _ids('AccountId', customer + 1),
+        'SubscriptionId': lambda r: _ids('SubscriptionId', customer + 1),
+        'CustomerId': lambda r: _ids('CustomerId', customer + 1),
+        'CurrencyCode': lambda r: np.full(n_rows, 'UGX'),
+        'CountryCode': lambda r: np.full(n_rows, 256),
+        'ProviderId': lambda r: _ids('ProviderId', r.integers(1, 7, n_rows)),
+        'ProductId': lambda r: _ids('ProductId', r.integers(1, 28, n_rows)),
+        'ProductCategory': lambda r: np.asarray(PRODUCT_CATEGORIES)[category],
+        'ChannelId': lambda r: _ids('ChannelId', r.choice([1, 2, 3, 5], n_rows, p=[0.01, 0.39, 0.59, 0.01])),
+        'Amount': lambda r: amount,
+        'Value': lambda r: np.abs(amount).astype(np.int64),
+        'TransactionStartTime': lambda r: pd.Series(start + seconds.astype('timedelta64[s]')).dt.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'PricingStrategy': lambda r: r.choice([0, 1, 2, 4], n_rows, p=[0.04, 0.02, 0.83, 0.11]),
+        'FraudResult': lambda r: (r.random(n_rows) < 0.002).astype(np.int64),
+    }
+    return pd.DataFrame({
+        col: generators[col](np.random.default_rng([seed, i]))
+        for i, col in enumerate(generators) if columns is None or col in columns
+    })
+
+
+def make_binned(n_rows: int, n_features: int = 10, n_bins: int = 20, seed: int = 42) -> pd.DataFrame:
+    '''
+    Generates a frame of binned features and a RiskResult target, like train_bins in WoE_and_IV.ipynb
+
+    Returns:
+        pd.DataFrame with columns feature_<i>_bin (categorical intervals) and RiskResult
+    '''
+    rng = np.random.default_rng(seed)
+    risk = (rng.random(n_rows) < 0.5).astype(np.int64)
+
+    data = {}
+    for i in range(n_features):
+        # Each feature is shifted by the target with a different strength
+        values = rng.normal(size=n_rows) + risk * (i / n_features)
+        data[f'feature_{i}_bin'] = pd.qcut(values, q=n_bins, duplicates='drop')
+    data['RiskResult'] = risk
+    return pd.DataFrame(data)
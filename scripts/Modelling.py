@@ -1,41 +1,248 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
-import scorecardpy as sc
+import weakref
 
-from sklearn.preprocessing import LabelEncoder
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, roc_auc_score, roc_curve, precision_score, recall_score, f1_score
+import numpy as np
+import pandas as pd
+
+
+def _auc(fpr: np.ndarray, tpr: np.ndarray) -> float:
+    # Trapezoidal area under the ROC curve like sklearn.metrics.auc, without importing sklearn.metrics
+    return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1])) / 2)
+
+
+class EvaluationReport:
+    '''
+    Scores a binary classifier once and derives every metric from that single pass.
+
+    The probabilities are sorted once; the cumulative true/false positive counts along that
+    order give the confusion matrix at any threshold, the ROC curve, AUC, KS and Gini
+    without scoring or sorting again.
+
+    Parameters:
+    -----------
+        y_true: the actual labels (0/1)
+        proba(np.ndarray): probability of the positive class
+        y_pred: the predicted labels, defaults to proba > 0.5
+    '''
+
+    def __init__(self, y_true, proba, y_pred=None):
+        self.y_true = np.asarray(y_true).astype(np.int64)
+        self.proba = np.asarray(proba, dtype=np.float64)
+        self.y_pred = (self.proba > 0.5).astype(np.int64) if y_pred is None else np.asarray(y_pred).astype(np.int64)
+
+        # Highest probability first, stable so ties keep their order
+        order = np.argsort(-self.proba, kind='mergesort')
+        self._sorted_proba = self.proba[order]
+        self._cum_tp = np.cumsum(self.y_true[order])
+        self.positives = int(self._cum_tp[-1]) if len(order) else 0
+        self.negatives = len(order) - self.positives
+
+        self.confusion_matrix = self.confusion(self.y_true, self.y_pred)
+
+
+    @classmethod
+    def from_model(cls, model, X, y_true):
+        '''
+        Builds the report from one predict_proba call, the predicted labels are the most probable class like model.predict
+
+        Returns:
+            EvaluationReport
+        '''
+        proba = model.predict_proba(X)
+        y_pred = model.classes_[np.argmax(proba, axis=1)]
+        return cls(y_true, proba[:, 1], y_pred)
+
+
+    @staticmethod
+    def confusion(y_true, y_pred) -> np.ndarray:
+        '''
+        The confusion matrix [[tn, fp], [fn, tp]] of 0/1 labels, like sklearn's confusion_matrix
+        '''
+        y_true = np.asarray(y_true).astype(bool)
+        y_pred = np.asarray(y_pred).astype(bool)
+        positives = int(np.count_nonzero(y_true))
+        tp = int(np.count_nonzero(y_pred & y_true))
+        fp = int(np.count_nonzero(y_pred)) - tp
+        return np.array([[len(y_true) - positives - fp, fp], [positives - tp, tp]])
+
+
+    @staticmethod
+    def _scores(tn, fp, fn, tp) -> dict:
+        n = tn + fp + fn + tp
+        return {
+            'accuracy': float((tp + tn) / n),
+            'precision': float(tp / (tp + fp)) if tp + fp else 0.0,
+            'recall': float(tp / (tp + fn)) if tp + fn else 0.0,
+            'f1': float(2 * tp / (2 * tp + fp + fn)) if tp + fp + fn else 0.0,
+        }
+
+
+    def roc_curve(self):
+        '''
+        The ROC curve at every distinct probability
+
+        Returns:
+            fpr, tpr, thresholds
+        '''
+        # Last row of every run of equal probabilities
+        distinct = np.r_[np.flatnonzero(np.diff(self._sorted_proba)), len(self._sorted_proba) - 1]
+        tps = np.r_[0, self._cum_tp[distinct]]
+        fps = np.r_[0, distinct + 1 - self._cum_tp[distinct]]
+        thresholds = np.r_[np.inf, self._sorted_proba[distinct]]
+        return fps / self.negatives, tps / self.positives, thresholds
+
+
+    @property
+    def roc_auc(self) -> float:
+        fpr, tpr, _ = self.roc_curve()
+        return _auc(fpr, tpr)
+
+
+    @property
+    def ks(self) -> float:
+        '''
+        Kolmogorov-Smirnov statistic, the largest gap between the true and false positive rates
+        '''
+        fpr, tpr, _ = self.roc_curve()
+        return float(np.max(tpr - fpr))
+
+
+    @property
+    def gini(self) -> float:
+        return 2 * self.roc_auc - 1
+
+
+    def metrics(self) -> dict:
+        '''
+        The metrics of the predicted labels and of the probabilities
+
+        Returns:
+            dict with accuracy, precision, recall, f1, roc_auc, ks and gini
+        '''
+        (tn, fp), (fn, tp) = self.confusion_matrix
+        fpr, tpr, _ = self.roc_curve()
+        roc_auc = _auc(fpr, tpr)
+        return {**self._scores(tn, fp, fn, tp), 'roc_auc': roc_auc, 'ks': float(np.max(tpr - fpr)), 'gini': 2 * roc_auc - 1}
+
+
+    def at_thresholds(self, thresholds) -> pd.DataFrame:
+        '''
+        The confusion matrix and metrics when the rows with proba >= threshold are predicted positive
+
+        Parameters:
+        -----------
+            thresholds(list): the probability cutoffs
+
+        Returns:
+            pd.DataFrame with one row per threshold
+        '''
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        # Number of rows with proba >= threshold, the sorted array is descending
+        k = np.searchsorted(-self._sorted_proba, -thresholds, side='right')
+        tp = np.where(k > 0, self._cum_tp[np.maximum(k - 1, 0)], 0)
+        fp = k - tp
+
+        rows = []
+        for threshold, tp_, fp_ in zip(thresholds, tp, fp):
+            tn_, fn_ = self.negatives - fp_, self.positives - tp_
+            rows.append({'threshold': threshold, 'tn': tn_, 'fp': fp_, 'fn': fn_, 'tp': tp_, **self._scores(tn_, fp_, fn_, tp_)})
+        return pd.DataFrame(rows)
 
 
 class Evaluation:
+    '''
+    The metrics and plots take an optional EvaluationReport. Without one the report of the
+    model on X_test is built once and cached, so evaluate, plot_roc_curve and roc_with_sc
+    do not score the same data again.
+
+    The cache only holds weak references to the models and data, so it does not keep test
+    matrices alive, and a model refitted in place gets a new report.
+    '''
+
+    def __init__(self):
+        # (id(model), id(X_test), id(y_test)) -> (weak references, fit marker, report). The callback of the
+        # weak references evicts the entry when one of the objects is collected, before its id can be reused
+        self._reports = {}
+
 
-    def evaluate(self, y_pred, y_test, X_test, model):
+    @staticmethod
+    def _fit_marker(model) -> tuple:
+        # Fitting sets n_features_in_ and the fitted attributes (coef_, estimators_, n_iter_, ...), so
+        # their content tells a refit apart, whether the attributes were replaced or modified in place
+        import joblib
+        fitted = {
+            name: value for name, value in vars(model).items()
+            if name.endswith('_') and not name.startswith('_')
+        }
+        return getattr(model, 'n_features_in_', None), joblib.hash(fitted)
+
+
+    def report(self, model, X_test, y_test, refresh: bool = False) -> EvaluationReport:
         '''
-        This funtion calculates the accuracy, precision, recall and f1 score for a given y_pred, y_test
+        The cached EvaluationReport of model on X_test, built on first use and again after model is refitted
+
+        Returns:
+            EvaluationReport
         '''
-        accuracy = accuracy_score(y_test, y_pred)
-        precision = precision_score(y_test, y_pred)
-        recall = recall_score(y_test, y_pred)
-        f1 = f1_score(y_test, y_pred)
-        class_proba = model.predict_proba(X_test)[:, 1]
+        objects = (model, X_test, y_test)
+        key = tuple(id(obj) for obj in objects)
+        marker = self._fit_marker(model)
+        cached = self._reports.get(key)
+        if not refresh and cached is not None and cached[1] == marker:
+            return cached[2]
+
+        report = EvaluationReport.from_model(model, X_test, y_test)
+        reports = self._reports
 
-        roc_auc = roc_auc_score(y_test, class_proba)
+        def evict(_):
+            # Only the entry these references belong to, not a newer one under the same key
+            if key in reports and reports[key][0] is refs:
+                del reports[key]
 
+        try:
+            refs = tuple(weakref.ref(obj, evict) for obj in objects)
+        except TypeError:
+            # Plain lists cannot be weakly referenced, their reports are not cached
+            return report
+        reports[key] = (refs, marker, report)
+        return report
 
-        print(f"Accuracy      : {accuracy:.4f}")
-        print(f"Precision     : {precision:.4f}")
-        print(f"Recall        : {recall:.4f}")
-        print(f"F1 Score      : {f1:.4f}")
-        print(f"Roc Auc Score : {roc_auc:.4f}")
 
+    def evaluate(self, y_pred, y_test, X_test, model, verbose: bool = True, report: EvaluationReport = None) -> dict:
+        '''
+        This funtion calculates the accuracy, precision, recall, f1, roc auc, ks and gini for a given y_pred, y_test
 
-    def plot_confusion_matrix(self, y_test, y_pred):
+        Returns:
+            dict of the metrics, so the scores of different models can be compared
+        '''
+        if report is None:
+            report = self.report(model, X_test, y_test)
+            if y_pred is not None and not np.array_equal(np.asarray(y_pred), report.y_pred):
+                report = EvaluationReport(y_test, report.proba, y_pred)
+
+        metrics = report.metrics()
+
+        if verbose:
+            print(f"Accuracy      : {metrics['accuracy']:.4f}")
+            print(f"Precision     : {metrics['precision']:.4f}")
+            print(f"Recall        : {metrics['recall']:.4f}")
+            print(f"F1 Score      : {metrics['f1']:.4f}")
+            print(f"Roc Auc Score : {metrics['roc_auc']:.4f}")
+            print(f"KS            : {metrics['ks']:.4f}")
+            print(f"Gini          : {metrics['gini']:.4f}")
+
+        return metrics
+
+
+    def plot_confusion_matrix(self, y_test, y_pred, report: EvaluationReport = None):
         '''
         This funtion calculates the confusion_matrix for a given model
         '''
 
-        cm = confusion_matrix(y_test, y_pred)
+        # The plotting libraries are imported on first use, the metrics and the training workers do not need them
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        cm = report.confusion_matrix if report is not None else EvaluationReport.confusion(y_test, y_pred)
 
         # Plot confusion matrix
         plt.figure(figsize=(5, 3))
@@ -47,7 +254,7 @@ class Evaluation:
         plt.show()
 
 
-    def plot_roc_curve(self, y_test, X_test, model):
+    def plot_roc_curve(self, y_test, X_test, model, report: EvaluationReport = None):
         '''
         This funtion plots roc curve for a given model
 
@@ -56,16 +263,17 @@ class Evaluation:
             y_test
             X_test
             model: models(like logistic regression, .....)
+            report(EvaluationReport): the scored test set, the cached report is used if not given
         '''
 
-        class_proba = model.predict_proba(X_test)[:, 1]
-        
-        roc_auc = roc_auc_score(y_test, class_proba)
+        import matplotlib.pyplot as plt
 
-        fpr, tpr, thresholds = roc_curve(y_test, class_proba)
+        report = report or self.report(model, X_test, y_test)
+
+        fpr, tpr, thresholds = report.roc_curve()
 
         plt.figure(figsize=(8, 6))
-        plt.plot(fpr, tpr, color='blue', label=f'ROC Curve (AUC = {roc_auc:.2f})')
+        plt.plot(fpr, tpr, color='blue', label=f'ROC Curve (AUC = {report.roc_auc:.2f})')
         plt.plot([0, 1], [0, 1], color='grey', linestyle='--')
 
         plt.title('Receiver Operating Characteristic (ROC) Curve')
@@ -73,14 +281,16 @@ class Evaluation:
         plt.ylabel('True Positive Rate')
         plt.legend(loc='lower right')
         plt.grid(True)
-        plt.show()  
+        plt.show()
 
 
-    def roc_with_sc(self, model, X_train, X_test, y_test, y_train):
+    def roc_with_sc(self, model, X_train, X_test, y_test, y_train, train_report: EvaluationReport = None, test_report: EvaluationReport = None):
         '''
         This funcion plots roc curve using the scorecard library for detailed analysis
         '''
-        train_pred = model.predict_proba(X_train)[:,1]
-        test_pred = model.predict_proba(X_test)[:,1]
+        import scorecardpy as sc
+
+        train_pred = (train_report or self.report(model, X_train, y_train)).proba
+        test_pred = (test_report or self.report(model, X_test, y_test)).proba
         train_perf = sc.perf_eva(y_train, train_pred, title = "train")
         test_perf = sc.perf_eva(y_test, test_pred, title = "test")
\ No newline at end of file
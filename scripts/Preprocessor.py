@@ -1,3 +1,5 @@
+import joblib
+import numpy as np
 import pandas as pd
 
 
@@ -8,11 +10,54 @@ class FeatureEngineering:
         self.data = data
 
 
-    def aggregate_features(self):
-        self.data['Total_transaction_amount'] = self.data.groupby(by='CustomerId')['Amount'].transform("sum")
-        self.data['Average_transaction_amount'] = self.data.groupby(by='CustomerId')['Amount'].transform("mean")
-        self.data['Transaction_Count'] = self.data.groupby(by='CustomerId')['TransactionId'].transform('size')
-        self.data['STD_Transaction_Amount'] = self.data.groupby(by='CustomerId')['Amount'].transform('std')
+    def aggregate_features(self, compact: bool = True):
+        '''
+        Adds the per-customer transaction aggregates to every transaction.
+
+        CustomerId is factorized once and all the statistics are computed together with
+        np.bincount over the codes, then broadcast back to the transactions with a single
+        gather (indexing by the codes) instead of one groupby/transform per statistic.
+
+        Parameters:
+        -----------
+            compact(bool): store Transaction_Count as int32 and the average/std as float32.
+                           The tree models work on float32 anyway. The total stays float64
+                           since sums of large amounts exceed float32 precision.
+        '''
+        codes, customers = pd.factorize(self.data['CustomerId'])
+        n_customers = len(customers)
+
+        amount = self.data['Amount'].to_numpy(dtype=np.float64)
+        has_customer = codes >= 0
+        has_amount = has_customer & ~np.isnan(amount)
+        # Only copy when there is something to leave out, which is rare
+        customer_codes = codes if has_customer.all() else codes[has_customer]
+        amount_codes, amount = (codes, amount) if has_amount.all() else (codes[has_amount], amount[has_amount])
+        del has_amount
+
+        size = np.bincount(customer_codes, minlength=n_customers)
+        count = np.bincount(amount_codes, minlength=n_customers)
+        total = np.bincount(amount_codes, weights=amount, minlength=n_customers)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            # Second pass over the deviations rather than a sum of squares, for accuracy.
+            # The deviations are computed in place in a single temporary array.
+            deviation = mean[amount_codes]
+            np.subtract(amount, deviation, out=deviation)
+            np.square(deviation, out=deviation)
+            m2 = np.bincount(amount_codes, weights=deviation, minlength=n_customers)
+            del deviation
+            std = np.sqrt(m2 / np.where(count > 1, count - 1, np.nan))
+
+        float_dtype, int_dtype = (np.float32, np.int32) if compact else (np.float64, np.int64)
+        # Rows without a CustomerId have code -1, which gathers the NaN appended at the end
+        self.data['Total_transaction_amount'] = np.append(total, np.nan)[codes]
+        self.data['Average_transaction_amount'] = np.append(mean, np.nan).astype(float_dtype)[codes]
+        if has_customer.all():
+            self.data['Transaction_Count'] = size.astype(int_dtype)[codes]
+        else:
+            self.data['Transaction_Count'] = np.append(size, np.nan)[codes]
+        self.data['STD_Transaction_Amount'] = np.append(std, np.nan).astype(float_dtype)[codes]
 
 
     def feature_extraction(self):
@@ -28,4 +73,179 @@ class FeatureEngineering:
         return self.data
 
 
+class CustomerAggregates:
+    '''
+    Mergeable per-customer accumulators of the transaction amounts.
+
+    For every customer it keeps the number of transactions, the count, sum and mean of
+    the amounts and M2 (the sum of squared deviations from the mean). Partial states of
+    different chunks are merged with Chan's parallel update of Welford's algorithm, so the
+    standard deviation is as accurate as a two pass computation over the full history.
+    '''
+
+    def __init__(self):
+        self.state = pd.DataFrame(
+            {'size': pd.Series(dtype='int64'), 'count': pd.Series(dtype='int64'),
+             'sum': pd.Series(dtype='float64'), 'mean': pd.Series(dtype='float64'), 'm2': pd.Series(dtype='float64')},
+            index=pd.Index([], name='CustomerId')
+        )
+
+
+    def update(self, chunk: pd.DataFrame):
+        '''
+        Folds a chunk of transactions into the accumulators
+        '''
+        amounts = chunk.groupby(by='CustomerId')['Amount']
+        partial = pd.DataFrame({
+            'size': chunk.groupby(by='CustomerId')['TransactionId'].size(),
+            'count': amounts.count(),
+            'sum': amounts.sum(),
+            'mean': amounts.mean().fillna(0),
+        })
+        partial['m2'] = amounts.var(ddof=0).fillna(0) * partial['count']
+        self.merge(partial)
+
+
+    def merge(self, partial: pd.DataFrame):
+        '''
+        Merges another state (e.g. the accumulators of another chunk or file) into this one
+        '''
+        a, b = self.state.align(partial, join='outer', fill_value=0)
+        # Customers present on one side only keep their state untouched
+        n = a['count'] + b['count']
+        delta = b['mean'] - a['mean']
+        safe_n = n.where(n > 0, 1)
+
+        merged = pd.DataFrame({
+            'size': a['size'] + b['size'],
+            'count': n,
+            'sum': a['sum'] + b['sum'],
+            'mean': (a['mean'] + delta * b['count'] / safe_n).where(a['count'] > 0, b['mean']),
+            'm2': a['m2'] + b['m2'] + delta ** 2 * a['count'] * b['count'] / safe_n,
+        })
+        self.state = merged.astype({'size': 'int64', 'count': 'int64'})
+
+
+    def aggregates(self) -> pd.DataFrame:
+        '''
+        The per-customer features computed by FeatureEngineering.aggregate_features
+
+        Returns:
+            pd.DataFrame indexed by CustomerId
+        '''
+        count = self.state['count']
+        return pd.DataFrame({
+            'Total_transaction_amount': self.state['sum'],
+            'Average_transaction_amount': self.state['sum'] / count.where(count > 0),
+            'Transaction_Count': self.state['size'],
+            'STD_Transaction_Amount': np.sqrt(self.state['m2'] / (count - 1).where(count > 1)),
+        })
+
+
+class ChunkedFeatureEngineering:
+    '''
+    Out-of-core version of FeatureEngineering.aggregate_features for transaction files
+    that don't fit in memory.
+
+    The first pass reads the CSV in chunks and folds them into CustomerAggregates, the
+    second pass reads it again and writes every chunk back with the aggregates joined on
+    CustomerId, so only one chunk and the per-customer state are in memory at a time.
+
+    Parameters:
+    -----------
+        file_path(str): the transactions CSV
+        chunksize(int): number of rows read at a time
+    '''
+
+    def __init__(self, file_path: str, chunksize: int = 1_000_000):
+        self.file_path = file_path
+        self.chunksize = chunksize
+
+
+    def _chunks(self, **kwargs):
+        return pd.read_csv(self.file_path, chunksize=self.chunksize, **kwargs)
+
+
+    def compute_aggregates(self) -> pd.DataFrame:
+        '''
+        Computes the per-customer aggregates in a single streaming pass over the file
+        '''
+        accumulator = CustomerAggregates()
+        for chunk in self._chunks(usecols=['TransactionId', 'CustomerId', 'Amount']):
+            accumulator.update(chunk)
+        return accumulator.aggregates()
+
+
+    def aggregate_features(self, output_path: str) -> pd.DataFrame:
+        '''
+        Writes the transactions with the aggregate columns added to output_path
+
+        Returns:
+            the per-customer aggregates
+        '''
+        aggregates = self.compute_aggregates()
+        aggregate_cols = list(aggregates.columns)
+
+        header = True
+        for chunk in self._chunks(low_memory=False):
+            # Recomputed columns replace stale ones, like the in-memory version overwrites them
+            chunk = chunk.drop(columns=aggregate_cols, errors='ignore')
+            chunk = chunk.join(aggregates, on='CustomerId')
+            chunk.to_csv(output_path, mode='w' if header else 'a', header=header, index=False)
+            header = False
+
+        return aggregates
+
+
+class PreprocessingArtifact:
+    '''
+    The fitted preprocessing used for training (scaling of the continuous features and
+    the one-hot layout of the categorical features) exported as a single artifact so the
+    API can reproduce it exactly instead of refitting it on every request.
+
+    The artifact is stored as a plain dict of lists and numpy arrays so it can be loaded
+    without scikit-learn.
+    '''
+
+    def __init__(self, columns: list, continuous_features: list, mean, scale, categorical_features: list = ['ProductCategory']):
+        self.columns = list(columns)
+        self.continuous_features = list(continuous_features)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.categorical_features = list(categorical_features)
+
+
+    @classmethod
+    def from_scaler(cls, scaler, continuous_features: list, columns: list, categorical_features: list = ['ProductCategory']):
+        '''
+        Builds the artifact from a fitted StandardScaler and the training column order
+
+        Parameters:
+        -----------
+            scaler(StandardScaler): scaler fitted on the continuous features
+            continuous_features(list): the columns the scaler was fitted on
+            columns(list): the columns of X after pd.get_dummies, in training order
+            categorical_features(list): the columns that were one-hot encoded
+        '''
+        return cls(columns, continuous_features, scaler.mean_, scaler.scale_, categorical_features)
+
+
+    def to_dict(self) -> dict:
+        categories = {
+            feature: [col[len(feature) + 1:] for col in self.columns if col.startswith(f'{feature}_')]
+            for feature in self.categorical_features
+        }
+        return {
+            'columns': self.columns,
+            'continuous_features': self.continuous_features,
+            'mean': self.mean,
+            'scale': self.scale,
+            'categories': categories,
+        }
+
 
+    def save(self, file_path: str):
+        '''
+        Saves the artifact next to the model, e.g. ../Models/preprocessing.pkl
+        '''
+        joblib.dump(self.to_dict(), file_path)
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+
+class RFMSScorer:
+    '''
+    Computes the RFMS proxy target of RFMS.ipynb per customer instead of per transaction.
+
+    The transactions are collapsed to one row per CustomerId in a single groupby (last
+    transaction, number of transactions and total amount), the ranks and the weighted
+    RFM_Score are computed with vectorized operations and the customers are split in two
+    with an exact 1-D 2-means threshold on the score.
+
+    The per-customer state is kept, so new transactions can be folded in with update()
+    without going through the full history again.
+
+    The labels are not those of the first version of RFMS.ipynb, which the notebook
+    recomputes to count the customers they relabel:
+        - the ranks are taken over customers, the notebook ranked transactions (and the
+          recency of each transaction), so a customer could get different labels
+        - M_rank_norm is the monetary rank over its maximum, the notebook divided F_rank
+          by the maximum M_rank, so the 0.60 monetary weight went to the frequency
+        - the threshold is the boundary between the two 2-means centers, the notebook cut
+          at kmeans.cluster_centers_[0], the upper center in its run
+
+    Parameters:
+    -----------
+        weights(tuple): weights of the recency, frequency and monetary ranks in the RFM_Score
+    '''
+
+    def __init__(self, weights: tuple = (0.15, 0.25, 0.60)):
+        self.weights = weights
+        self.state_ = None
+        self.reference_date_ = None
+        self.centers_ = None
+        self.threshold_ = None
+
+
+    def _collapse(self, data: pd.DataFrame) -> pd.DataFrame:
+        return data.groupby(by='CustomerId').agg(
+            Last_Transaction=('TransactionStartTime', 'max'),
+            Frequency=('TransactionId', 'count'),
+            Monetary=('Amount', 'sum'),
+        )
+
+
+    def fit(self, data: pd.DataFrame):
+        '''
+        Builds the per-customer state from the transactions and fits the risk threshold
+
+        Parameters:
+        -----------
+            data(pd.DataFrame): transactions with CustomerId, TransactionId, Amount and a datetime TransactionStartTime
+
+        Returns:
+            self
+        '''
+        self.state_ = self._collapse(data)
+        self.reference_date_ = self.state_['Last_Transaction'].max()
+        self.fit_threshold()
+        return self
+
+
+    def update(self, new_data: pd.DataFrame, refit: bool = False):
+        '''
+        Folds new transactions into the per-customer state, in time proportional to the
+        new transactions and the number of customers, not the full history
+
+        Parameters:
+        -----------
+            new_data(pd.DataFrame): the new transactions
+            refit(bool): refit the threshold on the new scores instead of keeping the current one
+
+        Returns:
+            self
+        '''
+        if self.state_ is None:
+            return self.fit(new_data)
+
+        delta = self._collapse(new_data)
+        state, delta = self.state_.align(delta, join='outer')
+        self.state_ = pd.DataFrame({
+            'Last_Transaction': pd.concat([state['Last_Transaction'], delta['Last_Transaction']], axis=1).max(axis=1),
+            'Frequency': state['Frequency'].fillna(0).add(delta['Frequency'].fillna(0)).astype('int64'),
+            'Monetary': state['Monetary'].fillna(0).add(delta['Monetary'].fillna(0)),
+        })
+        self.reference_date_ = max(self.reference_date_, delta['Last_Transaction'].max())
+
+        if refit:
+            self.fit_threshold()
+        return self
+
+
+    def scores(self) -> pd.DataFrame:
+        '''
+        The RFM values, normalized ranks and RFM_Score of every customer
+
+        Returns:
+            pd.DataFrame indexed by CustomerId
+        '''
+        RFM_data = pd.DataFrame({
+            'Recency': (self.reference_date_ - self.state_['Last_Transaction']).dt.days,
+            'Frequency': self.state_['Frequency'],
+            'Monetary': self.state_['Monetary'],
+        })
+
+        # The more recent, frequent and valuable the customer the higher the rank
+        ranks = {
+            'R_rank_norm': RFM_data['Recency'].rank(ascending=False),
+            'F_rank_norm': RFM_data['Frequency'].rank(ascending=True),
+            'M_rank_norm': RFM_data['Monetary'].rank(ascending=True),
+        }
+        for col, rank in ranks.items():
+            RFM_data[col] = (rank / rank.max()) * 100
+
+        r_weight, f_weight, m_weight = self.weights
+        RFM_data['RFM_Score'] = (r_weight * RFM_data['R_rank_norm'] +
+                                 f_weight * RFM_data['F_rank_norm'] +
+                                 m_weight * RFM_data['M_rank_norm'])
+
+        if self.threshold_ is not None:
+            RFM_data['RiskResult'] = (RFM_data['RFM_Score'] > self.threshold_).astype('int64')
+        return RFM_data
+
+
+    def fit_threshold(self):
+        '''
+        Splits the RFM scores in two clusters with exact 1-D 2-means.
+
+        In one dimension the optimal clusters are contiguous in sorted order, so every split
+        point is evaluated at once from prefix sums instead of running KMeans. The threshold
+        is the decision boundary between the two centers.
+        '''
+        scores = np.sort(self.scores()['RFM_Score'].to_numpy())
+        n = len(scores)
+        if n < 2 or scores[0] == scores[-1]:
+            self.centers_ = np.array([scores.mean(), scores.mean()]) if n else None
+            self.threshold_ = scores[-1] if n else None
+            return self
+
+        # Sum of the lower cluster for every split point k = 1 .. n-1
+        k = np.arange(1, n)
+        lower_sum = np.cumsum(scores)[:-1]
+        upper_sum = scores.sum() - lower_sum
+
+        # Minimizing the within cluster sum of squares is maximizing this
+        between = lower_sum ** 2 / k + upper_sum ** 2 / (n - k)
+        # Equal scores cannot be put in different clusters
+        between[scores[1:] == scores[:-1]] = -np.inf
+
+        split = int(np.argmax(between))
+        self.centers_ = np.array([lower_sum[split] / (split + 1), upper_sum[split] / (n - split - 1)])
+        self.threshold_ = float(self.centers_.mean())
+        return self
+
+
+    def label(self, data: pd.DataFrame) -> pd.Series:
+        '''
+        Maps the RiskResult of every customer back to a frame of transactions
+
+        Returns:
+            pd.Series aligned with data
+        '''
+        return data['CustomerId'].map(self.scores()['RiskResult']).rename('RiskResult')
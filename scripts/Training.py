@@ -0,0 +1,246 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from sklearn.base import clone
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+from Modelling import Evaluation, EvaluationReport
+from Utils import logger
+
+
+def _load(paths: dict) -> dict:
+    # Memory-mapped read only, every worker shares the pages of the same files
+    return {name: joblib.load(path, mmap_mode='r') for name, path in paths.items()}
+
+
+def _screen_candidate(paths: dict, name: str, estimator, params: dict, fit_rows: np.ndarray, val_rows: np.ndarray) -> dict:
+    '''
+    Fits a configuration on a subsample of the training rows and scores it on held out training rows
+    '''
+    data = _load(paths)
+    X, y = data['X_train'], data['y_train']
+
+    start = time.perf_counter()
+    model = clone(estimator).set_params(**params)
+    model.fit(X[fit_rows], y[fit_rows])
+    score = roc_auc_score(y[val_rows], model.predict_proba(X[val_rows])[:, 1])
+    return {'model': name, 'params': params, 'screen_roc_auc': score, 'screen_time': time.perf_counter() - start}
+
+
+def _fit_candidate(paths: dict, name: str, estimator, params: dict) -> tuple:
+    '''
+    Fits a configuration on all the training rows and evaluates it on the test set
+    '''
+    data = _load(paths)
+
+    start = time.perf_counter()
+    model = clone(estimator).set_params(**params)
+    model.fit(data['X_train'], data['y_train'])
+    fit_time = time.perf_counter() - start
+
+    report = EvaluationReport.from_model(model, data['X_test'], data['y_test'])
+    metrics = Evaluation().evaluate(report.y_pred, data['y_test'], data['X_test'], model, verbose=False, report=report)
+    return {'model': name, 'params': params, **metrics, 'fit_time': fit_time}, model
+
+
+class TrainingDriver:
+    '''
+    Trains candidate models and their hyperparameter configurations in a process pool and
+    ranks them on one leaderboard.
+
+    The training and test sets are dumped once to a scratch directory and every worker
+    memory-maps them, so the data is not pickled and copied for each task.
+
+    Hopeless configurations are stopped early: every configuration is first fitted on a
+    subsample of the training rows (screen_fraction) and scored on held out training rows.
+    Only the configurations within prune_margin of the best screening ROC AUC are fitted on
+    the full training set and evaluated on the test set with Evaluation.evaluate.
+
+    A configuration that raises (e.g. invalid hyperparameters) is logged and listed as failed
+    on the leaderboard, the other configurations still run.
+
+    Parameters:
+    -----------
+        X_train, y_train, X_test, y_test: the splits of Model_training.ipynb
+        n_jobs(int): number of processes, defaults to the number of CPUs
+        screen_fraction(float): fraction of the training rows used to screen the configurations, 0 to skip screening
+        prune_margin(float): configurations whose screening ROC AUC is more than this below the best are pruned
+        random_state(int): seed of the subsampling and of the sampled search grids
+    '''
+
+    def __init__(self, X_train, y_train, X_test, y_test, n_jobs: int = None, screen_fraction: float = 0.25,
+                 prune_margin: float = 0.02, random_state: int = 42):
+        self.X_train, self.y_train = X_train, y_train
+        self.X_test, self.y_test = X_test, y_test
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.screen_fraction = screen_fraction
+        self.prune_margin = prune_margin
+        self.random_state = random_state
+
+        self.candidates = []
+        self.models_ = {}
+        self.leaderboard_ = None
+
+
+    def add(self, name: str, estimator, param_grid: dict = None, n_iter: int = None):
+        '''
+        Adds a candidate model
+
+        Parameters:
+        -----------
+            name(str): name of the candidate on the leaderboard
+            estimator: unfitted sklearn classifier
+            param_grid(dict): hyperparameters to search, like GridSearchCV's param_grid
+            n_iter(int): number of configurations sampled from param_grid (like RandomizedSearchCV), all of them if None
+
+        Returns:
+            self
+        '''
+        if not param_grid:
+            configs = [{}]
+        elif n_iter is None:
+            configs = list(ParameterGrid(param_grid))
+        else:
+            configs = list(ParameterSampler(param_grid, n_iter=n_iter, random_state=self.random_state))
+
+        self.candidates.extend((name, estimator, params) for params in configs)
+        return self
+
+
+    def _dump(self, work_dir: str) -> dict:
+        paths = {}
+        for name in ['X_train', 'y_train', 'X_test', 'y_test']:
+            value = getattr(self, name)
+            value = value.to_numpy(dtype=np.float64) if name.startswith('X') and hasattr(value, 'to_numpy') else np.asarray(value)
+            paths[name] = os.path.join(work_dir, f'{name}.joblib')
+            joblib.dump(np.ascontiguousarray(value), paths[name])
+        return paths
+
+
+    def _screen(self, executor, paths: dict) -> pd.DataFrame:
+        rng = np.random.default_rng(self.random_state)
+        rows = rng.permutation(len(self.y_train))
+        n_val = max(1, len(rows) // 5)
+        val_rows = np.sort(rows[:n_val])
+        fit_rows = np.sort(rows[n_val:n_val + max(1, int(len(rows) * self.screen_fraction))])
+
+        futures = {
+            i: executor.submit(_screen_candidate, paths, name, estimator, params, fit_rows, val_rows)
+            for i, (name, estimator, params) in enumerate(self.candidates)
+        }
+        results, errors = self._collect(futures)
+        screened = pd.DataFrame([
+            results.get(i, {'model': name, 'params': params, 'screen_roc_auc': np.nan})
+            for i, (name, _, params) in enumerate(self.candidates)
+        ])
+        return screened, errors
+
+
+    def _collect(self, futures: dict) -> tuple:
+        '''
+        Waits for the tasks of the configurations. A configuration that raises (or whose worker
+        dies) is logged and recorded as failed, the others keep their results
+
+        Returns:
+            (results, errors): the results and the error messages by configuration index
+        '''
+        results, errors = {}, {}
+        for i, future in futures.items():
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                name, _, params = self.candidates[i]
+                logger.error(f"Error training {name} with {params}: {e}")
+                errors[i] = f"{type(e).__name__}: {e}"
+        return results, errors
+
+
+    def run(self) -> pd.DataFrame:
+        '''
+        Screens the configurations, fits the ones that are not pruned and ranks them
+
+        Returns:
+            leaderboard(pd.DataFrame): one row per configuration, sorted by test ROC AUC, then the pruned ones by
+                screening ROC AUC and the failed ones with their error
+
+        Raises:
+            ValueError if no candidate was added
+        '''
+        if not self.candidates:
+            raise ValueError('No candidate models to train, add them with add()')
+
+        work_dir = tempfile.mkdtemp(prefix='training-')
+        try:
+            paths = self._dump(work_dir)
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+                if self.screen_fraction:
+                    screened, errors = self._screen(executor, paths)
+                    # Failed configurations have no score and are never kept
+                    keep = screened['screen_roc_auc'] >= screened['screen_roc_auc'].max() - self.prune_margin
+                else:
+                    screened = pd.DataFrame({'model': [name for name, _, _ in self.candidates],
+                                             'params': [params for _, _, params in self.candidates],
+                                             'screen_roc_auc': np.nan})
+                    errors = {}
+                    keep = pd.Series(True, index=screened.index)
+
+                futures = {
+                    i: executor.submit(_fit_candidate, paths, *self.candidates[i])
+                    for i in screened.index[keep]
+                }
+                results, fit_errors = self._collect(futures)
+                errors.update(fit_errors)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        self.models_ = {}
+        rows = []
+        for i, row in screened.iterrows():
+            row = row.to_dict()
+            if i in results:
+                metrics, model = results[i]
+                row.update(metrics)
+                row['status'] = 'fitted'
+                self.models_[i] = model
+            elif i in errors:
+                row['status'] = 'failed'
+                row['error'] = errors[i]
+            else:
+                row['status'] = 'pruned'
+            rows.append(row)
+
+        leaderboard = pd.DataFrame(rows)
+        leaderboard['config'] = leaderboard.index
+        if 'roc_auc' not in leaderboard:
+            leaderboard['roc_auc'] = np.nan
+        # Fitted configurations first, then the pruned ones and the failed ones last
+        status_order = {'fitted': 0, 'pruned': 1, 'failed': 2}
+        leaderboard = leaderboard.sort_values(
+            ['status', 'roc_auc', 'screen_roc_auc'], ascending=[True, False, False], na_position='last',
+            key=lambda col: col.map(status_order) if col.name == 'status' else col,
+        )
+        self.leaderboard_ = leaderboard.reset_index(drop=True)
+        if not self.models_:
+            logger.error(f"None of the {len(self.candidates)} configurations could be fitted")
+        return self.leaderboard_
+
+
+    @property
+    def best_model_(self):
+        '''
+        The fitted model at the top of the leaderboard
+
+        Raises:
+            ValueError if no configuration was fitted (all of them failed, or run() was not called)
+        '''
+        if not self.models_:
+            raise ValueError('No configuration was fitted, see the status and error columns of leaderboard_')
+        return self.models_[self.leaderboard_['config'].iloc[0]]
@@ -1,11 +1,11 @@
 import os
 import logging
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import missingno as msno
 
 
 # ANSI Escape code to make the printing more appealing
@@ -21,64 +21,253 @@ ANSI_ESC = {
 
 
 
-log_dir = os.path.join(os.path.split(os.getcwd())[0], 'logs')
+logger = logging.getLogger()
 
-if not os.path.exists(log_dir):
-    os.mkdir(log_dir)
 
+def setup_logging(log_dir: str = None):
+    '''
+    Sends the logs to the console and to Info.log/Error.log, called once by the notebooks.
+    Importing the scripts configures nothing, so a batch job or API worker keeps its own logging.
+
+    Parameters:
+    -----------
+        log_dir(str): directory of the log files, defaults to the logs folder next to the current directory
+    '''
+    if log_dir is None:
+        log_dir = os.path.join(os.path.split(os.getcwd())[0], 'logs')
+
+    if not os.path.exists(log_dir):
+        os.mkdir(log_dir)
+
+    # Calling it again (e.g. re-running a notebook cell) does not duplicate the handlers
+    for handler in [h for h in logger.handlers if getattr(h, '_scripts_handler', False)]:
+        logger.removeHandler(handler)
+        handler.close()
+
+    log_file_info = os.path.join(log_dir, 'Info.log')
+    log_file_error = os.path.join(log_dir, 'Error.log')
+
+
+    info_handler = logging.FileHandler(log_file_info)
+    info_handler.setLevel(logging.INFO)
+
+    error_handler = logging.FileHandler(log_file_error)
+    error_handler.setLevel(logging.ERROR)
+
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s :: %(message)s',
+                                  datefmt="%Y-%m-%d %H:%M")
+
+    info_handler.setFormatter(formatter)
+    error_handler.setFormatter(formatter)
+
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+
+    logger.setLevel(logging.DEBUG)
+    for handler in (info_handler, error_handler, console_handler):
+        handler._scripts_handler = True
+        logger.addHandler(handler)
+
+
+# Schema of the Xente transaction file (data/data.csv): categoricals for the ids and
+# categories, narrow numeric types, and the fixed format of TransactionStartTime
+TRANSACTION_SCHEMA = {
+    'dtypes': {
+        'TransactionId': 'string',
+        'BatchId': 'string',
+        'AccountId': 'category',
+        'SubscriptionId': 'category',
+        'CustomerId': 'category',
+        'CurrencyCode': 'category',
+        'CountryCode': 'int16',
+        'ProviderId': 'category',
+        'ProductId': 'category',
+        'ProductCategory': 'category',
+        'ChannelId': 'category',
+        'Amount': 'float32',
+        'Value': 'int32',
+        'PricingStrategy': 'int8',
+        'FraudResult': 'int8',
+    },
+    'dates': {
+        'TransactionStartTime': '%Y-%m-%dT%H:%M:%S%z',
+    },
+}
 
 
-log_file_info = os.path.join(log_dir, 'Info.log')
-log_file_error = os.path.join(log_dir, 'Error.log')
+class DataUtils:
+    # def __init__(self, data):
+    #     self.data = data
 
 
-info_handler = logging.FileHandler(log_file_info)
-info_handler.setLevel(logging.INFO)
+    def load_data(self, file_name: str, columns: list = None, schema: dict = None, engine: str = None, chunksize: int = None):
+        '''
+        Load the file name from the data directory
 
-error_handler = logging.FileHandler(log_file_error)
-error_handler.setLevel(logging.ERROR)
+        The format is picked from the extension: .parquet and .feather are typed columnar
+        files that keep the datetime and categorical dtypes and only read the requested
+        columns, anything else is read as CSV.
 
-formatter = logging.Formatter('%(asctime)s - %(levelname)s :: %(message)s',
-                              datefmt="%Y-%m-%d %H:%M")
+        CSV files are read with the dtypes and datetime formats of schema when one is given
+        (e.g. TRANSACTION_SCHEMA), so the ids land as categoricals, the numbers in narrow
+        types and TransactionStartTime already parsed, by the multithreaded pyarrow parser.
 
-info_handler.setFormatter(formatter)
-error_handler.setFormatter(formatter)
+        Parameters:
+            file_name(str): name of the file
+            columns(list): only load these columns
+            schema(dict): {'dtypes': {column: dtype}, 'dates': {column: format}} of the CSV columns
+            engine(str): CSV parser, defaults to 'pyarrow' with a schema
+            chunksize(int): return an iterator of DataFrames of at most this many rows instead of one DataFrame,
+                            read one after the other from the file
 
+        Returns:
+            pd.DataFrame, or an iterator of pd.DataFrame with chunksize
+        '''
+        logger.debug("Loading data from file...")
+        try:
+            file_path = f"../data/{file_name}"
+            file_format = os.path.splitext(file_name)[1].lower()
+
+            if file_format == '.parquet':
+                if chunksize:
+                    import pyarrow.parquet as pq
+                    batches = pq.ParquetFile(file_path).iter_batches(batch_size=chunksize, columns=columns)
+                    return (batch.to_pandas() for batch in batches)
+                data = pd.read_parquet(file_path, columns=columns)
+            elif file_format == '.feather':
+                if chunksize:
+                    return self._read_feather_chunks(file_path, columns, chunksize)
+                # Memory mapped, so only the projected columns are actually read from disk
+                from pyarrow import feather
+                data = feather.read_table(file_path, columns=columns, memory_map=True).to_pandas()
+            elif schema is None:
+                data = pd.read_csv(file_path, usecols=columns, low_memory=False, chunksize=chunksize)
+            else:
+                data = self._read_csv_schema(file_path, columns, schema, engine, chunksize)
+            return data
 
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(logging.DEBUG)
-console_handler.setFormatter(formatter)
+        except Exception as e:
+            logger.error(f"Error loading data: {e}")
+            return None
 
-logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
-logger.addHandler(info_handler)
-logger.addHandler(error_handler)
-logger.addHandler(console_handler)
 
+    def _read_feather_chunks(self, file_path: str, columns: list, chunksize: int):
+        # A Feather file is an Arrow IPC file of record batches: the batches are decompressed one at a
+        # time from the memory map, so a chunk and its batch are all that is in memory
+        import pyarrow as pa
+        reader = pa.ipc.open_file(pa.memory_map(file_path))
 
-class DataUtils:
-    # def __init__(self, data):
-    #     self.data = data
+        def chunks():
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for start in range(0, batch.num_rows, chunksize):
+                    yield batch.slice(start, chunksize).to_pandas()
+        return chunks()
 
 
-    def load_data(self, file_name: str)->pd.DataFrame:
+    def _read_csv_schema(self, file_path: str, columns: list, schema: dict, engine: str, chunksize: int):
+        dtypes = {col: dtype for col, dtype in schema.get('dtypes', {}).items() if columns is None or col in columns}
+        dates = {col: fmt for col, fmt in schema.get('dates', {}).items() if columns is None or col in columns}
+
+        def parse_dates(data):
+            # The pyarrow parser gives seconds and the C parser microseconds, both paths return nanoseconds
+            for col, fmt in dates.items():
+                data[col] = pd.to_datetime(data[col], format=fmt).dt.as_unit('ns')
+            return data
+
+        if chunksize:
+            # The pyarrow parser cannot iterate, and each chunk gets the categories it contains
+            reader = pd.read_csv(file_path, usecols=columns, dtype=dtypes, chunksize=chunksize, engine='c' if engine in (None, 'pyarrow') else engine)
+            return (parse_dates(chunk) for chunk in reader)
+
+        return parse_dates(pd.read_csv(file_path, usecols=columns, dtype=dtypes, engine=engine or 'pyarrow'))
+
+
+    def save_data(self, data: pd.DataFrame, file_name: str):
         '''
-        Load the file name from the data directory
+        Save the data to the data directory, in the format given by the file extension
+        (.parquet, .feather or .csv)
 
         Parameters:
+            data(pd.DataFrame)
             file_name(str): name of the file
+        '''
+        logger.debug("Saving data to file...")
+        try:
+            file_path = f"../data/{file_name}"
+            file_format = os.path.splitext(file_name)[1].lower()
+
+            if file_format == '.parquet':
+                data.to_parquet(file_path, index=False)
+            elif file_format == '.feather':
+                data.reset_index(drop=True).to_feather(file_path)
+            else:
+                data.to_csv(file_path, index=False)
+
+        except Exception as e:
+            logger.error(f"Error saving data: {e}")
+
+
+    def load_customer_state(self, db_path: str = '../Model_Backend/db.sqlite3') -> pd.DataFrame:
+        '''
+        Load the per-customer aggregates kept up to date by the API
+        (manage.py absorb_transactions), so they don't have to be recomputed from the full history
+
+        Parameters:
+            db_path(str): path of the Django database
 
         Returns:
-            pd.DataFrame
+            pd.DataFrame indexed by CustomerId with the aggregate features, Recency and Frequency
         '''
-        logger.debug("Loading data from file...")
+        logger.debug("Loading customer state...")
         try:
-            data = pd.read_csv(f"../data/{file_name}", low_memory=False)
-            return data
-
+            with sqlite3.connect(db_path) as connection:
+                state = pd.read_sql_query('SELECT * FROM apis_customerstate', connection, index_col='CustomerId',
+                                          parse_dates=['First_Transaction', 'Last_Transaction'])
         except Exception as e:
-            logger.error(f"Error loading data: {e}")
+            logger.error(f"Error loading customer state: {e}")
+            return None
+
+        count = state['Amount_Count']
+        state['Average_transaction_amount'] = state['Total_transaction_amount'] / count.where(count > 0)
+        state['STD_Transaction_Amount'] = np.sqrt(state['Amount_M2'] / (count - 1).where(count > 1))
+        state['Recency'] = (state['Last_Transaction'].max() - state['Last_Transaction']).dt.days
+        state['Frequency'] = state['Transaction_Count']
+        return state
+
+
+    def convert_data(self, csv_name: str, file_name: str, datetime_cols: list = ['TransactionStartTime'], max_categories: int = 1000):
+        '''
+        Ingest the transaction CSV once (with TRANSACTION_SCHEMA) into a columnar file, parsing the datetime columns and storing
+        low cardinality text columns as categoricals, so later stages skip CSV parsing
+
+        Parameters:
+            csv_name(str): name of the CSV file in the data directory
+            file_name(str): name of the .parquet or .feather file to write
+            datetime_cols(list): columns parsed with pd.to_datetime
+            max_categories(int): text columns with at most this many distinct values become categoricals
+
+        Returns:
+            pd.DataFrame
+        '''
+        data = self.load_data(csv_name, schema=TRANSACTION_SCHEMA)
+        if data is None:
             return None
+
+        # The schema dates are already parsed
+        for col in datetime_cols:
+            if col in data.columns and not pd.api.types.is_datetime64_any_dtype(data[col]):
+                data[col] = pd.to_datetime(data[col])
+
+        for col in data.select_dtypes(include=['object', 'string']).columns:
+            if data[col].nunique() <= max_categories:
+                data[col] = data[col].astype('category')
+
+        self.save_data(data, file_name)
+        return data
         
 
 
@@ -154,21 +343,69 @@ class DataUtils:
 
 
 
+def _bin_counts(columns: pd.DataFrame, target_values: np.ndarray) -> list:
+    '''
+    Counts the All/Good/Bad rows of every bin of every column.
+
+    Each column is factorized on its own and counted with np.bincount over its own bins,
+    so the work space is one column of codes and three arrays of its number of bins,
+    whatever the number of columns. Missing values get the code -1 and are left out.
+
+    Returns:
+        list of (bins, all, good, bad) tuples, one per column
+    '''
+    good_rows = target_values == 0
+    bad_rows = target_values == 1
+
+    counts = []
+    for col in columns.columns:
+        codes, bins = pd.factorize(columns[col])
+        observed = codes >= 0
+        counts.append((
+            bins,
+            np.bincount(codes[observed], minlength=len(bins)),
+            np.bincount(codes[observed & good_rows], minlength=len(bins)),
+            np.bincount(codes[observed & bad_rows], minlength=len(bins)),
+        ))
+    return counts
+
+
 class WoE:
 
     # Function to compute Weight of Evidence
 
     def calculate_woe_iv(self,dataset, feature, target):
-        lst = []
-        for i in range(dataset[feature].nunique()):
-            val = list(dataset[feature].unique())[i]
-            lst.append({
-                'Bin Values': val,
-                'All': dataset[dataset[feature] == val].count()[feature],
-                'Good': dataset[(dataset[feature] == val) & (dataset[target] == 0)].count()[feature],
-                'Bad': dataset[(dataset[feature] == val) & (dataset[target] == 1)].count()[feature]
-            }) 
-        dset = pd.DataFrame(lst)
+        '''
+        Computes the WoE table and the IV of a binned feature in a single pass:
+        the bins are factorized once and the All/Good/Bad counts of every bin are
+        taken with np.bincount instead of filtering the frame once per bin.
+
+        Parameters:
+        -----------
+            dataset(pd.DataFrame)
+            feature(str): the binned feature
+            target(str): the binary target column (0 - good, 1 - bad)
+
+        Returns:
+            (pd.DataFrame, float): the WoE table sorted by WoE and the IV of the feature
+        '''
+        [counts] = _bin_counts(dataset[[feature]], dataset[target].to_numpy())
+        return self.woe_table(*counts)
+
+
+    def woe_table(self, bins, all_counts, good_counts, bad_counts):
+        '''
+        Builds the WoE table of a feature from the counts of its bins
+
+        Returns:
+            (pd.DataFrame, float): the WoE table sorted by WoE and the IV of the feature
+        '''
+        dset = pd.DataFrame({
+            'Bin Values': list(bins),
+            'All': all_counts,
+            'Good': good_counts,
+            'Bad': bad_counts
+        })
         dset['Distr_Good'] = dset['Good'] / dset['Good'].sum()
         dset['Distr_Bad'] = dset['Bad'] / dset['Bad'].sum()
         dset['WoE'] = np.log(dset['Distr_Good'] / dset['Distr_Bad'])
@@ -181,24 +418,47 @@ class WoE:
 
 
     # Computing WoEs and IVs
-    def compute_iv(self, train_bins):
-        lst = [] 
-        IV_df = pd.DataFrame(columns=['Variable','IV']) 
-        for col in train_bins.columns:
-            if col == 'RiskResult': continue 
-            else:
-                df, iv = self.calculate_woe_iv(train_bins, col, 'RiskResult')
-                    
-            lst.append(df)
-            
-            new_row = pd.DataFrame({
-                "Variable": [col],
-                "IV": [iv]
-            })    
+    def compute_iv(self, train_bins, target: str = 'RiskResult', block_size: int = 50, n_jobs: int = 1):
+        '''
+        Computes the IV and the WoE table of every feature of train_bins.
 
-            IV_df = pd.concat([IV_df, new_row], ignore_index=True)
+        The bin counts of a block of features are taken together (see _bin_counts), with
+        n_jobs > 1 the blocks are streamed to a process pool, which pays off for wide frames.
 
-        return IV_df
-        
+        Parameters:
+        -----------
+            train_bins(pd.DataFrame): binned features and the target
+            target(str): the binary target column
+            block_size(int): number of features counted by a worker at a time
+            n_jobs(int): number of processes, 1 to count in this process
 
-        
\ No newline at end of file
+        Returns:
+            IV_df(pd.DataFrame): the Variable and IV of every feature
+            woe_tables(dict): the WoE table of every feature
+        '''
+        features = [col for col in train_bins.columns if col != target]
+        target_values = train_bins[target].to_numpy()
+        # The blocks are sliced as they are counted, so only the blocks in flight are copied
+        blocks = (train_bins[features[i:i + block_size]] for i in range(0, len(features), block_size))
+
+        if n_jobs == 1 or len(features) <= block_size:
+            counts = [_bin_counts(block, target_values) for block in blocks]
+        else:
+            counts = []
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                # At most two blocks per worker are pickled and waiting at a time
+                pending = deque()
+                for block in blocks:
+                    pending.append(executor.submit(_bin_counts, block, target_values))
+                    if len(pending) >= 2 * n_jobs:
+                        counts.append(pending.popleft().result())
+                counts.extend(future.result() for future in pending)
+
+        woe_tables = {}
+        ivs = []
+        for feature, feature_counts in zip(features, (c for block in counts for c in block)):
+            woe_tables[feature], iv = self.woe_table(*feature_counts)
+            ivs.append(iv)
+
+        IV_df = pd.DataFrame({'Variable': features, 'IV': ivs})
+        return IV_df, woe_tables
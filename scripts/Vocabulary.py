@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+
+class VocabularyEncoder:
+    '''
+    Integer codes for the id and category columns, persisted so that serving and later
+    runs reproduce exactly the codes used in training.
+
+    Each vocabulary is the sorted distinct values of its column, so the codes are the ones
+    LabelEncoder gives. Values outside the vocabulary (new customers, providers, ...) all get
+    the unseen bucket code len(vocabulary) instead of raising.
+
+    Fitting is one factorize per column (a pass over the category codes for categorical
+    columns), encoding is a hash lookup of the values in the vocabulary index.
+
+    The vocabularies are stored as one unicode array per column in a compressed .npz file,
+    readable with numpy alone (see apis/vocabulary.py in Model_Backend).
+
+    Parameters:
+    -----------
+        columns(list): the id/category columns to encode
+    '''
+
+    def __init__(self, columns: list):
+        self.columns = list(columns)
+        self.vocabularies = {}
+        self._indexes = {}
+
+
+    @staticmethod
+    def _factorize(values: pd.Series):
+        # Codes of the values and the sorted distinct values, -1 for missing values
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Only the categories are sorted, the rows are a lookup in the category codes
+            codes = values.cat.codes.to_numpy()
+            used = np.unique(codes[codes >= 0])
+            categories = values.cat.categories[used].astype(str).to_numpy(dtype=str)
+            order = np.argsort(categories, kind='stable')
+            category_codes = np.full(len(values.cat.categories) + 1, -1, dtype=np.int64)
+            category_codes[used[order]] = np.arange(len(used))
+            return category_codes[codes], categories[order]
+
+        codes, uniques = pd.factorize(values.astype(str).where(values.notna()), sort=True)
+        return codes, np.asarray(uniques, dtype=str)
+
+
+    def _set(self, column: str, vocabulary: np.ndarray):
+        self.vocabularies[column] = vocabulary
+        self._indexes[column] = pd.Index(vocabulary)
+
+
+    def fit(self, data: pd.DataFrame):
+        '''
+        Builds the vocabulary of every column
+
+        Returns:
+            self
+        '''
+        for col in self.columns:
+            self._set(col, self._factorize(data[col])[1])
+        return self
+
+
+    def fit_transform(self, data: pd.DataFrame) -> pd.DataFrame:
+        '''
+        Builds the vocabularies and replaces the columns by their codes, from the same factorize pass
+
+        Returns:
+            pd.DataFrame
+        '''
+        data = data.copy()
+        for col in self.columns:
+            codes, vocabulary = self._factorize(data[col])
+            self._set(col, vocabulary)
+            data[col] = np.where(codes >= 0, codes, len(vocabulary)).astype(np.int32)
+        return data
+
+
+    def encode(self, column: str, values) -> np.ndarray:
+        '''
+        Codes of values in the vocabulary of column, unseen and missing values get len(vocabulary)
+
+        Returns:
+            np.ndarray of int32
+        '''
+        index = self._indexes[column]
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+            # Look up the categories once and take the codes of the rows
+            category_codes = np.append(index.get_indexer(values.cat.categories.astype(str)), -1)
+            codes = category_codes[values.cat.codes.to_numpy()]
+        else:
+            codes = index.get_indexer(pd.Index(values).astype(str))
+        return np.where(codes >= 0, codes, len(index)).astype(np.int32)
+
+
+    def transform(self, data: pd.DataFrame) -> pd.DataFrame:
+        '''
+        Replaces the columns by their codes
+
+        Returns:
+            pd.DataFrame
+        '''
+        data = data.copy()
+        for col in self.columns:
+            data[col] = self.encode(col, data[col])
+        return data
+
+
+    def save(self, file_path: str, columns: list = None):
+        '''
+        Saves the vocabularies, e.g. to ../Models/vocabulary.npz
+
+        Parameters:
+        -----------
+            file_path(str): the .npz file
+            columns(list): the vocabularies to save, defaults to all. Row-unique ids such as
+                TransactionId are no use on new data and would make the file as large as the data
+        '''
+        columns = list(columns or self.columns)
+        np.savez_compressed(
+            file_path, __columns__=np.asarray(columns, dtype=str),
+            **{col: self.vocabularies[col] for col in columns},
+        )
+
+
+    @classmethod
+    def load(cls, file_path):
+        '''
+        Loads vocabularies saved with save()
+
+        Returns:
+            VocabularyEncoder
+        '''
+        with np.load(file_path, allow_pickle=False) as stored:
+            encoder = cls(stored['__columns__'].tolist())
+            for col in encoder.columns:
+                encoder._set(col, stored[col])
+        return encoder
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+from pyarrow import feather
+
+from benchmarks.synthetic import make_transactions
+from scripts.Utils import TRANSACTION_SCHEMA, DataUtils
+
+
+class LoadDataTests(unittest.TestCase):
+    '''
+    load_data reads from ../data/, so the tests run from <tmp>/notebooks
+    '''
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        os.makedirs(os.path.join(directory.name, 'data'))
+        os.makedirs(os.path.join(directory.name, 'notebooks'))
+
+        cwd = os.getcwd()
+        os.chdir(os.path.join(directory.name, 'notebooks'))
+        self.addCleanup(os.chdir, cwd)
+
+        self.data_utils = DataUtils()
+        self.data = make_transactions(2500, seed=3)
+
+    def assert_same_chunks(self, file_name, chunksize, columns=None):
+        whole = self.data_utils.load_data(file_name, columns=columns)
+        chunks = list(self.data_utils.load_data(file_name, columns=columns, chunksize=chunksize))
+        self.assertTrue(all(len(chunk) <= chunksize for chunk in chunks))
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), whole)
+
+    def test_feather_chunks(self):
+        self.data_utils.save_data(self.data, 'data.feather')
+        self.assert_same_chunks('data.feather', 1000)
+        self.assert_same_chunks('data.feather', 1000, columns=['CustomerId', 'Amount'])
+
+    def test_feather_chunks_across_record_batches(self):
+        feather.write_feather(self.data, '../data/batches.feather', chunksize=700)
+        self.assert_same_chunks('batches.feather', 300)
+
+    def test_parquet_chunks(self):
+        self.data_utils.save_data(self.data, 'data.parquet')
+        self.assert_same_chunks('data.parquet', 1000, columns=['CustomerId', 'Amount'])
+
+    def test_csv_schema_dates_have_one_unit(self):
+        self.data_utils.save_data(self.data, 'data.csv')
+        whole = self.data_utils.load_data('data.csv', schema=TRANSACTION_SCHEMA)
+        chunks = list(self.data_utils.load_data('data.csv', schema=TRANSACTION_SCHEMA, chunksize=1000))
+
+        self.assertEqual(whole['TransactionStartTime'].dtype, 'datetime64[ns, UTC]')
+        for chunk in chunks:
+            self.assertEqual(chunk['TransactionStartTime'].dtype, whole['TransactionStartTime'].dtype)
+        pd.testing.assert_series_equal(
+            pd.concat(chunks, ignore_index=True)['TransactionStartTime'], whole['TransactionStartTime'],
+        )
+        pd.testing.assert_series_equal(
+            whole['TransactionStartTime'], pd.to_datetime(self.data['TransactionStartTime']).dt.as_unit('ns'),
+        )
+
+    def test_convert_data_keeps_the_parsed_dates(self):
+        self.data_utils.save_data(self.data, 'data.csv')
+        with mock.patch('scripts.Utils.pd.to_datetime', wraps=pd.to_datetime) as to_datetime:
+            converted = self.data_utils.convert_data('data.csv', 'data.parquet')
+        # Parsed once, by the schema
+        self.assertEqual(to_datetime.call_count, 1)
+        pd.testing.assert_frame_equal(self.data_utils.load_data('data.parquet'), converted)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import gc
+import unittest
+
+import numpy as np
+from sklearn import metrics
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from scripts.Modelling import Evaluation, EvaluationReport
+
+
+def make_scores(n_rows: int = 2000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(0, 2, n_rows)
+    # Rounded, so many rows share a probability
+    proba = np.round(np.clip(0.3 * y_true + rng.uniform(0, 0.7, n_rows), 0, 1), 2)
+    return y_true, proba
+
+
+class EvaluationReportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.y_true, self.proba = make_scores()
+        self.report = EvaluationReport(self.y_true, self.proba)
+
+    def test_metrics_match_sklearn(self):
+        y_pred = (self.proba > 0.5).astype(int)
+        fpr, tpr, _ = metrics.roc_curve(self.y_true, self.proba)
+        expected = {
+            'accuracy': metrics.accuracy_score(self.y_true, y_pred),
+            'precision': metrics.precision_score(self.y_true, y_pred),
+            'recall': metrics.recall_score(self.y_true, y_pred),
+            'f1': metrics.f1_score(self.y_true, y_pred),
+            'roc_auc': metrics.roc_auc_score(self.y_true, self.proba),
+            'ks': np.max(tpr - fpr),
+            'gini': 2 * metrics.roc_auc_score(self.y_true, self.proba) - 1,
+        }
+        result = self.report.metrics()
+        self.assertEqual(result.keys(), expected.keys())
+        for name, value in expected.items():
+            self.assertAlmostEqual(result[name], value, places=12, msg=name)
+        np.testing.assert_array_equal(self.report.confusion_matrix, metrics.confusion_matrix(self.y_true, y_pred))
+
+    def test_roc_curve_matches_sklearn(self):
+        fpr, tpr, thresholds = self.report.roc_curve()
+        expected_fpr, expected_tpr, expected_thresholds = metrics.roc_curve(self.y_true, self.proba, drop_intermediate=False)
+        np.testing.assert_allclose(fpr, expected_fpr)
+        np.testing.assert_allclose(tpr, expected_tpr)
+        np.testing.assert_allclose(thresholds[1:], expected_thresholds[1:])
+
+    def test_at_thresholds_match_sklearn(self):
+        thresholds = [0.0, 0.25, 0.5, 0.73, 1.0, 1.5]
+        table = self.report.at_thresholds(thresholds)
+        for row, threshold in zip(table.itertuples(), thresholds):
+            y_pred = (self.proba >= threshold).astype(int)
+            (tn, fp), (fn, tp) = metrics.confusion_matrix(self.y_true, y_pred, labels=[0, 1])
+            self.assertEqual((row.tn, row.fp, row.fn, row.tp), (tn, fp, fn, tp))
+            self.assertAlmostEqual(row.accuracy, metrics.accuracy_score(self.y_true, y_pred))
+            self.assertAlmostEqual(row.precision, metrics.precision_score(self.y_true, y_pred, zero_division=0))
+            self.assertAlmostEqual(row.recall, metrics.recall_score(self.y_true, y_pred))
+            self.assertAlmostEqual(row.f1, metrics.f1_score(self.y_true, y_pred))
+
+    def test_from_model_matches_predict(self):
+        X = self.proba.reshape(-1, 1)
+        model = LogisticRegression().fit(X, self.y_true)
+        report = EvaluationReport.from_model(model, X, self.y_true)
+        np.testing.assert_array_equal(report.y_pred, model.predict(X))
+        np.testing.assert_allclose(report.proba, model.predict_proba(X)[:, 1])
+
+
+class EvaluationCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.X = rng.normal(size=(500, 4))
+        self.y = (self.X[:, 0] + rng.normal(scale=0.5, size=500) > 0).astype(int)
+        self.evaluation = Evaluation()
+
+    def test_report_is_cached(self):
+        model = LogisticRegression().fit(self.X, self.y)
+        report = self.evaluation.report(model, self.X, self.y)
+        self.assertIs(self.evaluation.report(model, self.X, self.y), report)
+        self.assertIsNot(self.evaluation.report(model, self.X, self.y, refresh=True), report)
+
+    def test_refit_in_place_gets_a_new_report(self):
+        model = DecisionTreeClassifier(max_depth=1, random_state=0).fit(self.X, self.y)
+        report = self.evaluation.report(model, self.X, self.y)
+
+        model.set_params(max_depth=4).fit(self.X, self.y)
+        refreshed = self.evaluation.report(model, self.X, self.y)
+        self.assertIsNot(refreshed, report)
+        np.testing.assert_allclose(refreshed.proba, model.predict_proba(self.X)[:, 1])
+
+    def test_coefficients_changed_in_place_get_a_new_report(self):
+        model = LogisticRegression().fit(self.X, self.y)
+        report = self.evaluation.report(model, self.X, self.y)
+        model.coef_ *= -1
+        self.assertIsNot(self.evaluation.report(model, self.X, self.y), report)
+
+    def test_collected_objects_are_evicted(self):
+        model = LogisticRegression().fit(self.X, self.y)
+        X = self.X.copy()
+        self.evaluation.report(model, X, self.y)
+        self.assertEqual(len(self.evaluation._reports), 1)
+
+        del X
+        gc.collect()
+        self.assertEqual(self.evaluation._reports, {})
+
+        # A new matrix, whatever its id, is scored again
+        X = self.X * 2
+        report = self.evaluation.report(model, X, self.y)
+        np.testing.assert_allclose(report.proba, model.predict_proba(X)[:, 1])
+
+    def test_lists_are_not_cached(self):
+        model = LogisticRegression().fit(self.X, self.y)
+        y = list(self.y)
+        report = self.evaluation.report(model, self.X, y)
+        self.assertIsNot(self.evaluation.report(model, self.X, y), report)
+        self.assertEqual(self.evaluation._reports, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_transactions
+from scripts.Preprocessor import ChunkedFeatureEngineering, CustomerAggregates, FeatureEngineering
+
+
+AGGREGATE_COLUMNS = ['Total_transaction_amount', 'Average_transaction_amount', 'Transaction_Count', 'STD_Transaction_Amount']
+
+
+def legacy_aggregate_features(data):
+    # aggregate_features as it was before the fused pass, one groupby/transform per statistic
+    data['Total_transaction_amount'] = data.groupby(by='CustomerId')['Amount'].transform("sum")
+    data['Average_transaction_amount'] = data.groupby(by='CustomerId')['Amount'].transform("mean")
+    data['Transaction_Count'] = data.groupby(by='CustomerId')['TransactionId'].transform('size')
+    data['STD_Transaction_Amount'] = data.groupby(by='CustomerId')['Amount'].transform('std')
+    return data
+
+
+class AggregateFeaturesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.data = make_transactions(5000, n_customers=300, seed=0, columns=['TransactionId', 'CustomerId', 'Amount'])
+
+    def assert_same_aggregates(self, data, compact):
+        expected = legacy_aggregate_features(data.copy())
+        FeatureEngineering(data).aggregate_features(compact=compact)
+        for col in AGGREGATE_COLUMNS:
+            np.testing.assert_allclose(
+                data[col].to_numpy(dtype=np.float64), expected[col].to_numpy(dtype=np.float64),
+                rtol=1e-6 if compact else 1e-12, err_msg=col,
+            )
+
+    def test_fused_pass_matches_legacy(self):
+        for compact in (False, True):
+            self.assert_same_aggregates(self.data.copy(), compact)
+
+    def test_compact_dtypes(self):
+        FeatureEngineering(self.data).aggregate_features(compact=True)
+        self.assertEqual(self.data['Transaction_Count'].dtype, np.int32)
+        self.assertEqual(self.data['Average_transaction_amount'].dtype, np.float32)
+        self.assertEqual(self.data['STD_Transaction_Amount'].dtype, np.float32)
+        self.assertEqual(self.data['Total_transaction_amount'].dtype, np.float64)
+
+    def test_missing_customers_and_amounts(self):
+        data = self.data.copy()
+        data.loc[data.index[::7], 'Amount'] = np.nan
+        data.loc[data.index[::11], 'CustomerId'] = None
+        # A customer whose only transaction has no amount
+        data.loc[len(data)] = ['TransactionId_new', 'CustomerId_new', np.nan]
+        for compact in (False, True):
+            self.assert_same_aggregates(data.copy(), compact)
+
+
+class ChunkedFeatureEngineeringTests(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.data = make_transactions(3000, n_customers=150, seed=1, columns=['TransactionId', 'CustomerId', 'Amount', 'ProductCategory'])
+        self.input_path = os.path.join(self.directory, 'data.csv')
+        self.data.to_csv(self.input_path, index=False)
+
+    def test_chunked_file_matches_legacy(self):
+        output_path = os.path.join(self.directory, 'features.csv')
+        ChunkedFeatureEngineering(self.input_path, chunksize=700).aggregate_features(output_path)
+
+        result = pd.read_csv(output_path)
+        expected = legacy_aggregate_features(self.data.copy())
+        pd.testing.assert_frame_equal(result[list(self.data.columns)], self.data)
+        for col in AGGREGATE_COLUMNS:
+            np.testing.assert_allclose(result[col], expected[col], rtol=1e-9, err_msg=col)
+
+    def test_merged_states_match_a_single_state(self):
+        whole = CustomerAggregates()
+        whole.update(self.data)
+
+        merged = CustomerAggregates()
+        for bounds in np.array_split(np.arange(len(self.data)), 5):
+            part = CustomerAggregates()
+            part.update(self.data.iloc[bounds])
+            merged.merge(part.state)
+
+        pd.testing.assert_frame_equal(merged.aggregates().sort_index(), whole.aggregates().sort_index(), rtol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+
+from benchmarks.synthetic import make_transactions
+from scripts.RFMS import RFMSScorer
+
+
+def make_data(n_rows: int = 4000, seed: int = 0) -> pd.DataFrame:
+    data = make_transactions(n_rows, n_customers=200, seed=seed, columns=['TransactionId', 'CustomerId', 'Amount', 'TransactionStartTime'])
+    data['TransactionStartTime'] = pd.to_datetime(data['TransactionStartTime'])
+    return data
+
+
+class RFMSScorerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.data = make_data()
+        self.rfms = RFMSScorer().fit(self.data)
+
+    def test_scores_match_the_rfm_formula(self):
+        customers = self.data.groupby('CustomerId')
+        recency = (self.data['TransactionStartTime'].max() - customers['TransactionStartTime'].max()).dt.days
+        R_rank = recency.rank(ascending=False)
+        F_rank = customers['TransactionId'].count().rank(ascending=True)
+        M_rank = customers['Amount'].sum().rank(ascending=True)
+        expected = (0.15 * R_rank / R_rank.max() * 100 +
+                    0.25 * F_rank / F_rank.max() * 100 +
+                    0.60 * M_rank / M_rank.max() * 100)
+
+        scores = self.rfms.scores()
+        pd.testing.assert_series_equal(scores['RFM_Score'], expected, check_names=False)
+        pd.testing.assert_series_equal(scores['Recency'], recency, check_names=False)
+
+    def test_threshold_is_the_optimal_2_means_split(self):
+        scores = np.sort(self.rfms.scores()['RFM_Score'].to_numpy())
+        # Within cluster sum of squares of every split point, lowest first
+        costs = [
+            ((scores[:k] - scores[:k].mean()) ** 2).sum() + ((scores[k:] - scores[k:].mean()) ** 2).sum()
+            for k in range(1, len(scores)) if scores[k] != scores[k - 1]
+        ]
+        labels = self.rfms.scores()['RiskResult'].to_numpy()
+        upper = scores[-labels.sum():]
+        lower = scores[:len(scores) - labels.sum()]
+        cost = ((lower - lower.mean()) ** 2).sum() + ((upper - upper.mean()) ** 2).sum()
+        self.assertAlmostEqual(cost, min(costs), places=6)
+
+        np.testing.assert_allclose(np.sort(self.rfms.centers_), [lower.mean(), upper.mean()])
+        self.assertAlmostEqual(self.rfms.threshold_, np.mean(self.rfms.centers_))
+
+    def test_labels_match_kmeans(self):
+        scores = self.rfms.scores()
+        kmeans = KMeans(n_clusters=2, n_init=10, random_state=0).fit(scores[['RFM_Score']])
+        upper_cluster = int(np.argmax(kmeans.cluster_centers_[:, 0]))
+        np.testing.assert_array_equal(scores['RiskResult'].to_numpy(), (kmeans.labels_ == upper_cluster).astype(int))
+
+    def test_update_matches_a_full_fit(self):
+        data = self.data.sort_values('TransactionStartTime')
+        first, second = data.iloc[:2500], data.iloc[2500:]
+        incremental = RFMSScorer().fit(first).update(second, refit=True)
+
+        pd.testing.assert_frame_equal(incremental.scores().sort_index(), self.rfms.scores().sort_index())
+        self.assertEqual(incremental.threshold_, self.rfms.threshold_)
+
+    def test_label_maps_customers_to_transactions(self):
+        labels = self.rfms.label(self.data)
+        self.assertEqual(len(labels), len(self.data))
+        expected = self.data['CustomerId'].map(self.rfms.scores()['RiskResult'])
+        pd.testing.assert_series_equal(labels, expected.rename('RiskResult'))
+
+
+if __name__ == '__main__':
+    unittest.main()
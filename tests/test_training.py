@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+# Training imports its siblings like the notebooks do, from the scripts directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from Training import TrainingDriver
+
+
+def make_splits(n_rows: int = 600, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 5))
+    y = (X[:, 0] - X[:, 1] + rng.normal(scale=0.7, size=n_rows) > 0).astype(int)
+    split = n_rows * 3 // 4
+    return X[:split], y[:split], X[split:], y[split:]
+
+
+class TrainingDriverTests(unittest.TestCase):
+
+    def setUp(self):
+        self.splits = make_splits()
+
+    def test_failing_configurations_do_not_abort_the_run(self):
+        driver = TrainingDriver(*self.splits, n_jobs=2, prune_margin=1.0)
+        # C must be positive, so the second configuration raises when it is fitted
+        driver.add('LogisticRegression', LogisticRegression(), {'C': [1.0, -1.0]})
+        driver.add('DecisionTree', DecisionTreeClassifier(random_state=0), {'max_depth': [2, 4]})
+        with self.assertLogs(level='ERROR'):
+            leaderboard = driver.run()
+
+        self.assertEqual(sorted(leaderboard['status']), ['failed', 'fitted', 'fitted', 'fitted'])
+        failed = leaderboard[leaderboard['status'] == 'failed'].iloc[0]
+        self.assertEqual(failed['params'], {'C': -1.0})
+        self.assertIn('C', failed['error'])
+        self.assertEqual(leaderboard['status'].iloc[-1], 'failed')
+
+        fitted = leaderboard[leaderboard['status'] == 'fitted']
+        self.assertTrue(fitted['roc_auc'].is_monotonic_decreasing)
+        self.assertIs(driver.best_model_, driver.models_[leaderboard['config'].iloc[0]])
+
+    def test_failures_without_screening(self):
+        driver = TrainingDriver(*self.splits, n_jobs=2, screen_fraction=0)
+        driver.add('LogisticRegression', LogisticRegression(), {'C': [-1.0, 1.0]})
+        with self.assertLogs(level='ERROR'):
+            leaderboard = driver.run()
+        self.assertEqual(list(leaderboard['status']), ['fitted', 'failed'])
+        self.assertEqual(driver.best_model_.C, 1.0)
+
+    def test_no_fitted_configuration(self):
+        driver = TrainingDriver(*self.splits, n_jobs=1)
+        driver.add('LogisticRegression', LogisticRegression(), {'C': [-1.0, -2.0]})
+        with self.assertLogs(level='ERROR'):
+            leaderboard = driver.run()
+        self.assertEqual(list(leaderboard['status']), ['failed', 'failed'])
+        with self.assertRaisesRegex(ValueError, 'No configuration was fitted'):
+            driver.best_model_
+
+    def test_no_candidates(self):
+        with self.assertRaisesRegex(ValueError, 'No candidate models'):
+            TrainingDriver(*self.splits, n_jobs=1).run()
+
+
+if __name__ == '__main__':
+    unittest.main()
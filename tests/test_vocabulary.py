@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from benchmarks.synthetic import make_transactions
+from scripts.Vocabulary import VocabularyEncoder
+
+
+COLUMNS = ['ProviderId', 'ProductId', 'ChannelId', 'ProductCategory']
+
+
+class VocabularyEncoderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.data = make_transactions(3000, seed=2, columns=COLUMNS)
+
+    def test_codes_match_label_encoder(self):
+        encoded = VocabularyEncoder(COLUMNS).fit_transform(self.data)
+        for col in COLUMNS:
+            np.testing.assert_array_equal(encoded[col], LabelEncoder().fit_transform(self.data[col]), err_msg=col)
+            self.assertEqual(encoded[col].dtype, np.int32)
+
+    def test_categorical_columns_give_the_same_codes(self):
+        categorical = self.data.astype('category')
+        # Categories that no row uses are not part of the vocabulary
+        categorical['ProviderId'] = categorical['ProviderId'].cat.add_categories(['ProviderId_unused'])
+
+        encoder = VocabularyEncoder(COLUMNS).fit(categorical)
+        expected = VocabularyEncoder(COLUMNS).fit(self.data)
+        for col in COLUMNS:
+            np.testing.assert_array_equal(encoder.vocabularies[col], expected.vocabularies[col], err_msg=col)
+        pd.testing.assert_frame_equal(encoder.transform(categorical), expected.transform(self.data))
+
+    def test_unseen_and_missing_values_get_the_bucket_code(self):
+        encoder = VocabularyEncoder(['ProviderId']).fit(self.data)
+        bucket = len(encoder.vocabularies['ProviderId'])
+        known = self.data['ProviderId'].iloc[0]
+        values = pd.Series([known, 'ProviderId_unseen', None])
+        for series in (values, values.astype('category')):
+            codes = encoder.encode('ProviderId', series)
+            np.testing.assert_array_equal(codes, [encoder.encode('ProviderId', [known])[0], bucket, bucket])
+
+    def test_save_and_load(self):
+        encoder = VocabularyEncoder(COLUMNS).fit(self.data)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'vocabulary.npz')
+            encoder.save(path, columns=['ProviderId', 'ChannelId'])
+            loaded = VocabularyEncoder.load(path)
+
+        self.assertEqual(loaded.columns, ['ProviderId', 'ChannelId'])
+        for col in loaded.columns:
+            np.testing.assert_array_equal(loaded.vocabularies[col], encoder.vocabularies[col])
+            np.testing.assert_array_equal(loaded.encode(col, self.data[col]), encoder.encode(col, self.data[col]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from scripts.Utils import WoE
+
+
+def legacy_woe_iv(dataset, feature, target):
+    # calculate_woe_iv as it was before the bincount rewrite, one boolean mask per bin
+    lst = []
+    for i in range(dataset[feature].nunique()):
+        val = list(dataset[feature].unique())[i]
+        lst.append({
+            'Bin Values': val,
+            'All': dataset[dataset[feature] == val].count()[feature],
+            'Good': dataset[(dataset[feature] == val) & (dataset[target] == 0)].count()[feature],
+            'Bad': dataset[(dataset[feature] == val) & (dataset[target] == 1)].count()[feature]
+        })
+    dset = pd.DataFrame(lst)
+    dset['Distr_Good'] = dset['Good'] / dset['Good'].sum()
+    dset['Distr_Bad'] = dset['Bad'] / dset['Bad'].sum()
+    dset['WoE'] = np.log(dset['Distr_Good'] / dset['Distr_Bad'])
+    dset = dset.replace({'WoE': {np.inf: 0, -np.inf: 0}})
+    dset['IV'] = (dset['Distr_Good'] - dset['Distr_Bad']) * dset['WoE']
+    iv = dset['IV'].sum()
+    dset = dset.sort_values(by='WoE')
+    return dset, iv
+
+
+def legacy_compute_iv(train_bins):
+    # compute_iv before the single-pass rewrite, one calculate_woe_iv per feature
+    rows = []
+    for col in train_bins.columns:
+        if col == 'RiskResult':
+            continue
+        rows.append({'Variable': col, 'IV': legacy_woe_iv(train_bins, col, 'RiskResult')[1]})
+    return pd.DataFrame(rows)
+
+
+def make_bins(n_rows: int = 2000, seed: int = 0) -> pd.DataFrame:
+    # Binned features like the ones of WoE_and_IV.ipynb: qcut intervals, integer and string bins
+    rng = np.random.default_rng(seed)
+    amount = rng.lognormal(7, 1.5, n_rows)
+    return pd.DataFrame({
+        'Amount_bin': pd.qcut(amount, q=20, duplicates='drop'),
+        'Hour_bin': rng.integers(0, 24, n_rows),
+        'Channel_bin': rng.choice(['ChannelId_1', 'ChannelId_2', 'ChannelId_3', 'ChannelId_5'], n_rows),
+        # A bin with only good rows, whose WoE is replaced by 0
+        'Pure_bin': np.where(amount > np.quantile(amount, 0.95), 'top', 'rest'),
+        'RiskResult': (rng.random(n_rows) < 0.1 + 0.3 * (amount > np.median(amount))).astype(int),
+    }).assign(RiskResult=lambda data: np.where(data['Pure_bin'] == 'top', 0, data['RiskResult']))
+
+
+class WoETests(unittest.TestCase):
+
+    def setUp(self):
+        self.bins = make_bins()
+
+    def assert_same_table(self, table, legacy):
+        pd.testing.assert_frame_equal(table.reset_index(drop=True), legacy.reset_index(drop=True), check_dtype=False)
+
+    def test_calculate_woe_iv_matches_legacy(self):
+        for feature in ('Amount_bin', 'Hour_bin', 'Channel_bin', 'Pure_bin'):
+            table, iv = WoE().calculate_woe_iv(self.bins, feature, 'RiskResult')
+            legacy_table, legacy_iv = legacy_woe_iv(self.bins, feature, 'RiskResult')
+            self.assert_same_table(table, legacy_table)
+            self.assertAlmostEqual(iv, legacy_iv, places=12)
+
+    def test_compute_iv_matches_legacy(self):
+        legacy = legacy_compute_iv(self.bins)
+        for block_size, n_jobs in ((50, 1), (1, 1), (2, 2)):
+            IV_df, woe_tables = WoE().compute_iv(self.bins, block_size=block_size, n_jobs=n_jobs)
+            pd.testing.assert_frame_equal(IV_df, legacy, check_dtype=False)
+            for feature in legacy['Variable']:
+                self.assert_same_table(woe_tables[feature], legacy_woe_iv(self.bins, feature, 'RiskResult')[0])
+
+    def test_missing_bins_are_left_out(self):
+        bins = self.bins.assign(Hour_bin=self.bins['Hour_bin'].astype(float).mask(self.bins['Hour_bin'] == 3))
+        table, _ = WoE().calculate_woe_iv(bins, 'Hour_bin', 'RiskResult')
+        self.assertEqual(table['All'].sum(), bins['Hour_bin'].notna().sum())
+        self.assertNotIn(3, table['Bin Values'].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()